@@ -1,21 +1,26 @@
 import logging
+import multiprocessing
+import uuid
 import uvicorn
 import webbrowser
 import threading
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from routes.parser_routes import router as parser_router
 from config.settings import settings
+from utils.compression import CompressionMiddleware
+from utils.captcha_pool import warm_up_captcha_pool, shutdown_captcha_pool
+from utils.proxy_manager import proxy_manager
+from driver_manager.standby_pool import standby_pool
+from utils.metrics import render_metrics, CONTENT_TYPE_LATEST
+from utils.logging_setup import setup_logging, shutdown_logging, request_id_var
 from pyngrok import ngrok
 import time
 
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: JSON через очередь, запись в потоке QueueListener
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
@@ -36,19 +41,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сжатие крупных ответов (результаты парсинга) по Accept-Encoding
+if settings.RESPONSE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
 # Add request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
+    # Корреляционный id попадает во все логи запроса, включая потоки воркеров
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:12]
+    token = request_id_var.set(request_id)
     
-    logger.info(f"Request: {request.method} {request.url}")
-    
-    response = await call_next(request)
-    
-    process_time = time.time() - start_time
-    logger.info(f"Response: {response.status_code} - {process_time:.2f}s")
-    
-    return response
+    try:
+        logger.info(f"Request: {request.method} {request.url}")
+        
+        response = await call_next(request)
+        
+        process_time = time.time() - start_time
+        logger.info(f"Response: {response.status_code} - {process_time:.2f}s")
+        response.headers["X-Request-ID"] = request_id
+        
+        return response
+    finally:
+        request_id_var.reset(token)
 
 
 # Global exception handler
@@ -75,6 +91,12 @@ async def root():
     }
 
 
+# Prometheus
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 def start_ngrok_tunnel():
     """
     Запускает ngrok туннель и возвращает публичную ссылку
@@ -118,6 +140,10 @@ def start_ngrok_tunnel():
 async def startup_event():
     logger.info("Starting Ozon Price Parser API...")
     logger.info(f"Settings: Headless={settings.HEADLESS}, Max articles={settings.MAX_ARTICLES_PER_REQUEST}")
+    warm_up_captcha_pool()
+    proxy_manager.start_health_checks()
+    proxy_manager.start_watching()
+    standby_pool.start()
 
 
 # Shutdown event
@@ -136,9 +162,17 @@ async def shutdown_event():
     from routes.parser_routes import parser_instance
     if parser_instance:
         parser_instance.close()
+    
+    standby_pool.stop()
+    shutdown_captcha_pool()
+    proxy_manager.stop_health_checks()
+    proxy_manager.stop_watching()
+    shutdown_logging()
 
 
 if __name__ == "__main__":
+    # Нужно для пула процессов капчи в собранном exe (PyInstaller)
+    multiprocessing.freeze_support()
     logger.info("🚀 Запуск Ozon Parser API с ngrok интеграцией...")
     
     # Запускаем ngrok туннель
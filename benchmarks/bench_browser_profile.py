@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Память и время запуска браузера на воркер: полный профиль против LOW_MEMORY_BROWSER.
+
+Для каждого профиля поднимает несколько драйверов подряд, открывает в каждом
+главную и composer-api локального mock Ozon (benchmarks/mock_ozon.py) и меряет
+RSS дерева процессов Chrome каждого драйвера. Нужны Chrome и psutil, прокси выключены.
+По результатам можно оценить, сколько воркеров (MAX_WORKERS) помещается в память хоста.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_browser_profile [--drivers 3] [--port 8901]
+"""
+
+import argparse
+import time
+from statistics import mean
+
+from benchmarks.bench_end_to_end import configure_environment, start_mock, stop_mock
+
+
+def run_profile(low_memory: bool, drivers: int):
+    from config.settings import settings
+    from driver_manager.selenium_manager import SeleniumManager
+    from utils.helpers import build_ozon_api_url
+    from utils.process_monitor import process_monitor
+
+    settings.LOW_MEMORY_BROWSER = low_memory
+    managers, handles, startups = [], [], []
+    try:
+        for index in range(drivers):
+            manager = SeleniumManager()
+            start = time.perf_counter()
+            manager.setup_driver()
+            startups.append(time.perf_counter() - start)
+            managers.append(manager)
+
+            manager.navigate_to_url(settings.OZON_BASE_URL)
+            manager.navigate_to_url(build_ozon_api_url(1_000_000 + index))
+            handles.append(process_monitor.register(index + 1, manager.process_pids()))
+
+        # Рендереры добирают память после загрузки — даём устояться
+        time.sleep(2)
+        trees = [process_monitor.sample(handle) for handle in handles]
+        rss = [tree.rss / 1024 / 1024 for tree in trees if tree is not None]
+        processes = [tree.processes for tree in trees if tree is not None]
+        return {
+            "startup": mean(startups),
+            "rss_mean": mean(rss) if rss else None,
+            "rss_max": max(rss) if rss else None,
+            "processes": mean(processes) if processes else None,
+        }
+    finally:
+        for handle in handles:
+            process_monitor.unregister(handle)
+        for manager in managers:
+            manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS и время запуска браузера: полный и облегчённый профиль")
+    parser.add_argument("--drivers", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8901)
+    args = parser.parse_args()
+
+    configure_environment(args.port)
+
+    from benchmarks.mock_ozon import MockConfig
+    from utils.process_monitor import process_monitor
+
+    if not process_monitor.enabled:
+        print("psutil не установлен — память не измеряется")
+
+    mock = start_mock(MockConfig(latency_ms=20, jitter_ms=0, assets=40), args.port)
+    print(f"{'профиль':>12} {'запуск, с':>10} {'RSS ср., МБ':>12} {'RSS макс., МБ':>14} {'процессов':>10}")
+    try:
+        for name, low_memory in (("full", False), ("low_memory", True)):
+            row = run_profile(low_memory, args.drivers)
+            rss_mean = f"{row['rss_mean']:12.0f}" if row["rss_mean"] is not None else f"{'-':>12}"
+            rss_max = f"{row['rss_max']:14.0f}" if row["rss_max"] is not None else f"{'-':>14}"
+            processes = f"{row['processes']:10.1f}" if row["processes"] is not None else f"{'-':>10}"
+            print(f"{name:>12} {row['startup']:10.2f} {rss_mean} {rss_max} {processes}")
+    finally:
+        stop_mock(mock)
+
+
+if __name__ == "__main__":
+    main()
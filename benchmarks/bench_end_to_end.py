@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Сквозной бенчмарк парсера против локального mock Ozon (benchmarks/mock_ozon.py).
+
+Поднимает mock в фоновом потоке, направляет на него OZON_BASE_URL / OZON_API_URL
+и прогоняет OzonParser с разным числом воркеров. Для каждого прогона печатает
+артикулы/сек, p50/p95/p99 времени на артикул, трафик браузеров и CPU/RSS
+процесса вместе с браузерами (если установлен psutil). Нужен локальный Chrome,
+прокси и лимит запросов (PROXY_RATE_PER_MINUTE) выключены — иначе все воркеры делят
+один бакет прямого подключения и масштабирование упирается в лимит, а не в железо.
+mock работает в отдельном процессе: его CPU не входит в CPU/RSS парсера и печатается отдельно.
+--no-block-requests — прогон без блокировки картинок/шрифтов/трекеров.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_end_to_end [--workers 1 2 4] [--articles 40] [--captcha-rate 0.05] [--assets 40]
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import tempfile
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # без psutil CPU/RSS не печатаются
+    psutil = None
+
+MOCK_HOST = "127.0.0.1"
+
+
+def configure_environment(port: int, block_requests: bool = True, rate_per_minute: float = 0):
+    """
+    Настройки парсера читаются при импорте, поэтому окружение задаём до него.
+    rate_per_minute — лимит запросов на прокси (здесь на прямое подключение); 0 — без лимита
+    """
+    base_url = f"http://{MOCK_HOST}:{port}"
+    os.environ["OZON_BASE_URL"] = base_url
+    os.environ["OZON_API_URL"] = f"{base_url}/api/composer-api.bx/page/json/v2"
+    os.environ["ENABLE_PROXY"] = "false"
+    os.environ["HEADLESS"] = "true"
+    os.environ["SESSION_STORE_DIR"] = tempfile.mkdtemp(prefix="bench_sessions_")
+    os.environ["BLOCK_REQUESTS"] = "true" if block_requests else "false"
+    os.environ["PROXY_RATE_PER_MINUTE"] = str(rate_per_minute)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def _serve_mock(config, port: int):
+    import uvicorn
+    from benchmarks.mock_ozon import create_app
+
+    uvicorn.run(create_app(config), host=MOCK_HOST, port=port, log_level="warning")
+
+
+def start_mock(config, port: int, timeout: float = 30):
+    """mock Ozon в отдельном процессе (его CPU не смешивается с парсером); возвращает процесс"""
+    process = multiprocessing.get_context("spawn").Process(target=_serve_mock, args=(config, port), daemon=True)
+    process.start()
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if not process.is_alive():
+            raise RuntimeError("mock Ozon exited on startup")
+        try:
+            socket.create_connection((MOCK_HOST, port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError(f"mock Ozon did not start on port {port}")
+
+
+def stop_mock(process):
+    process.terminate()
+    process.join(timeout=5)
+
+
+def percentile(values, percent: float) -> float:
+    """Перцентиль по ближайшему рангу"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def process_tree_usage(process, exclude=()):
+    """(cpu_seconds, rss_mb) процесса и всех дочерних (chromedriver, chrome), кроме pid из exclude"""
+    cpu = rss = 0.0
+    for proc in [process] + process.children(recursive=True):
+        if proc.pid in exclude:
+            continue
+        try:
+            times = proc.cpu_times()
+            cpu += times.user + times.system
+            rss += proc.memory_info().rss
+        except psutil.Error:
+            continue
+    return cpu, rss / 1024 / 1024
+
+
+def run(parser, articles, workers: int, mock_pid: int = None):
+    from parser.ozon_parser import BatchTimeline
+
+    # Фиксируем число воркеров независимо от оценок времени в OzonParser
+    parser.MAX_WORKERS = workers
+    parser.MIN_ARTICLES_PER_WORKER = 1
+    parser.ESTIMATED_TIME_PER_ARTICLE = parser.TARGET_TIME_SECONDS * len(articles)
+
+    process = psutil.Process() if psutil is not None else None
+    mock = psutil.Process(mock_pid) if process is not None and mock_pid else None
+    exclude = {mock_pid} if mock_pid else set()
+    peak_rss = 0.0
+    stop = threading.Event()
+
+    def sample_rss():
+        nonlocal peak_rss
+        while not stop.wait(0.5):
+            peak_rss = max(peak_rss, process_tree_usage(process, exclude)[1])
+
+    if process is not None:
+        cpu_before = process_tree_usage(process, exclude)[0]
+        mock_cpu_before = process_tree_usage(mock)[0] if mock else 0.0
+        threading.Thread(target=sample_rss, daemon=True).start()
+
+    timeline = BatchTimeline()
+    start = time.perf_counter()
+    results = parser.parse_articles(articles, timeline=timeline)
+    elapsed = time.perf_counter() - start
+    stop.set()
+
+    totals = [result.timings.total for result in results if result.timings]
+    summary = timeline.summary()
+    row = {
+        "workers": workers,
+        "success": sum(1 for result in results if result.success),
+        "articles": len(results),
+        "rate": len(results) / elapsed if elapsed else 0.0,
+        "p50": percentile(totals, 50),
+        "p95": percentile(totals, 95),
+        "p99": percentile(totals, 99),
+        "traffic_mb": sum(worker.network_bytes for worker in summary.workers) / 1024 / 1024,
+        "blocked": sum(worker.blocked_requests for worker in summary.workers),
+        "cpu": None,
+        "rss": None,
+        "mock_cpu": None,
+    }
+    if process is not None:
+        row["cpu"] = process_tree_usage(process, exclude)[0] - cpu_before
+        row["rss"] = peak_rss
+        if mock:
+            row["mock_cpu"] = process_tree_usage(mock)[0] - mock_cpu_before
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк парсера против mock Ozon")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--articles", type=int, default=40)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--antibot-rate", type=float, default=0.0)
+    parser.add_argument("--captcha-rate", type=float, default=0.0)
+    parser.add_argument("--assets", type=int, default=40, help="Картинок витрины на главной mock Ozon")
+    parser.add_argument("--asset-kb", type=int, default=50)
+    parser.add_argument("--no-block-requests", action="store_true", help="Не блокировать лишние запросы")
+    parser.add_argument("--rate-per-minute", type=float, default=0,
+                        help="Лимит запросов к mock на подключение, как PROXY_RATE_PER_MINUTE; 0 — без лимита")
+    args = parser.parse_args()
+
+    configure_environment(args.port, block_requests=not args.no_block_requests,
+                          rate_per_minute=args.rate_per_minute)
+
+    from benchmarks.mock_ozon import MockConfig
+    from parser.ozon_parser import OzonParser
+
+    mock = start_mock(MockConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                   antibot_rate=args.antibot_rate, captcha_rate=args.captcha_rate,
+                                   assets=args.assets, asset_kb=args.asset_kb), args.port)
+    articles = list(range(1_000_000, 1_000_000 + args.articles))
+    ozon_parser = OzonParser()
+
+    print(f"Mock Ozon на порту {args.port}: задержка {args.latency_ms:.0f}±{args.jitter_ms:.0f} мс, "
+          f"антибот {args.antibot_rate:.0%}, капча {args.captcha_rate:.0%}; артикулов: {args.articles}; "
+          f"блокировка запросов: {'нет' if args.no_block_requests else 'да'}; "
+          f"лимит запросов: {f'{args.rate_per_minute:g}/мин' if args.rate_per_minute else 'нет'}")
+    if psutil is None:
+        print("psutil не установлен — CPU/RSS не измеряются")
+    print(f"{'воркеры':>8} {'успех':>9} {'арт/с':>8} {'p50, с':>8} {'p95, с':>8} {'p99, с':>8} "
+          f"{'трафик, МБ':>11} {'блок.':>6} {'CPU, с':>8} {'RSS, МБ':>9} {'CPU mock, с':>12}")
+
+    try:
+        for workers in args.workers:
+            row = run(ozon_parser, articles, workers, mock.pid)
+            cpu = f"{row['cpu']:8.1f}" if row["cpu"] is not None else f"{'-':>8}"
+            rss = f"{row['rss']:9.0f}" if row["rss"] is not None else f"{'-':>9}"
+            mock_cpu = f"{row['mock_cpu']:12.1f}" if row["mock_cpu"] is not None else f"{'-':>12}"
+            print(f"{row['workers']:>8} {row['success']:>4}/{row['articles']:<4} {row['rate']:8.2f} "
+                  f"{row['p50']:8.2f} {row['p95']:8.2f} {row['p99']:8.2f} "
+                  f"{row['traffic_mb']:11.1f} {row['blocked']:>6} {cpu} {rss} {mock_cpu}")
+    finally:
+        stop_mock(mock)
+
+
+if __name__ == "__main__":
+    main()
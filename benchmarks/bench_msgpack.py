@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк MessagePack против JSON для ответа /get_price.
+
+Меряет стоимость кодирования на сервере и декодирования у клиента,
+а также размер тела для 150 и 5000 результатов.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_msgpack [повторов]
+"""
+
+import json
+import sys
+import time
+
+import msgpack
+import orjson
+
+from benchmarks.fixtures import build_sample_response
+
+
+def measure(func, repeats: int) -> float:
+    """Среднее время вызова в миллисекундах"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def run(count: int, repeats: int):
+    content = build_sample_response(count).model_dump()
+
+    codecs = [
+        ("json (stdlib)",
+         lambda: json.dumps(content, ensure_ascii=False).encode("utf-8"),
+         lambda body: json.loads(body)),
+        ("orjson",
+         lambda: orjson.dumps(content),
+         lambda body: orjson.loads(body)),
+        ("msgpack",
+         lambda: msgpack.packb(content, use_bin_type=True),
+         lambda body: msgpack.unpackb(body, raw=False)),
+    ]
+
+    print(f"\n📦 Результатов: {count}, повторов: {repeats}")
+    print("=" * 64)
+    print(f"{'Формат':<18}{'encode, мс':>14}{'decode, мс':>14}{'байт':>14}")
+    for name, encode, decode in codecs:
+        body = encode()
+        assert decode(body) == content
+        print(f"{name:<18}{measure(encode, repeats):>14.3f}"
+              f"{measure(lambda: decode(body), repeats):>14.3f}{len(body):>14}")
+    print("=" * 64)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    for count in (150, 5000):
+        run(count, repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сериализации ответа /get_price: время и размер на проводе.
+
+Сравнивает стандартный путь FastAPI (jsonable_encoder + json.dumps)
+с model_dump + orjson, а также размер тела после gzip и brotli.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_serialization [кол-во_результатов] [повторов]
+"""
+
+import json
+import sys
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.fixtures import build_sample_response
+from utils.compression import brotli, compress_body
+
+
+def measure(func, repeats: int) -> float:
+    """Среднее время вызова в миллисекундах"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    response = build_sample_response(count)
+
+    def default_path() -> bytes:
+        # То, что делает FastAPI для response_model + JSONResponse
+        return json.dumps(
+            jsonable_encoder(response), ensure_ascii=False, allow_nan=False,
+            indent=None, separators=(",", ":")
+        ).encode("utf-8")
+
+    def orjson_path() -> bytes:
+        return orjson.dumps(response.model_dump())
+
+    body = orjson_path()
+
+    print(f"📦 Результатов в ответе: {count}, повторов: {repeats}")
+    print("=" * 60)
+    print(f"{'Сериализация':<32}{'мс/ответ':>12}{'байт':>14}")
+    print(f"{'FastAPI default (json)':<32}{measure(default_path, repeats):>12.3f}{len(default_path()):>14}")
+    print(f"{'model_dump + orjson':<32}{measure(orjson_path, repeats):>12.3f}{len(body):>14}")
+
+    print("=" * 60)
+    print(f"{'Сжатие':<32}{'мс/ответ':>12}{'байт':>14}")
+    gzip_body = compress_body(body, "gzip")
+    print(f"{'gzip (level 6)':<32}{measure(lambda: compress_body(body, 'gzip'), repeats):>12.3f}{len(gzip_body):>14}")
+    if brotli is not None:
+        br_body = compress_body(body, "br")
+        print(f"{'brotli (quality 5)':<32}{measure(lambda: compress_body(body, 'br'), repeats):>12.3f}{len(br_body):>14}")
+    else:
+        print("⚠️  brotli не установлен, br пропущен")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Офлайн-оценка решателя капчи на сохранённом корпусе.
+
+Корпус собирается при SAVE_CAPTCHA_SAMPLES=true: для каждой капчи сохраняются
+фон, пазл и смещение слайдера, которое в итоге сработало. Скрипт прогоняет
+образцы через методы оценки смещения и печатает долю попаданий в допуск
+и время на одно решение.
+
+Запуск из корня проекта:
+    python -m benchmarks.captcha_harness [папка_корпуса] [--tolerance 6]
+"""
+
+import argparse
+import logging
+import time
+from statistics import mean
+
+from config.settings import settings
+from utils.captcha_corpus import load_corpus
+from utils.captcha_solver import OzonCaptchaSolverV3
+from utils.image_utils import enhance_captcha_image, find_best_match_template
+
+
+def make_solver(meta):
+    """Решатель без браузера с параметрами капчи из метаданных образца"""
+    solver = OzonCaptchaSolverV3(driver=None)
+    solver.scale = meta["scale"]
+    solver.container_width = meta["container_width"]
+    return solver
+
+
+def predict_precise_offset(sample, pyramid_levels=0):
+    meta = sample["meta"]
+    solver = make_solver(meta)
+    settings.CAPTCHA_PYRAMID_LEVELS = pyramid_levels
+    return solver.calculate_precise_offset(sample["background"], sample["puzzle"],
+                                           current_left=meta["puzzle_left"],
+                                           current_top=meta.get("puzzle_top"))
+
+
+def predict_best_match_template(sample, pyramid_levels=0, use_row_band=False):
+    meta = sample["meta"]
+    solver = make_solver(meta)
+
+    y_hint = None
+    if use_row_band and meta.get("puzzle_top") is not None:
+        y_hint = meta["puzzle_top"] / meta["scale"]
+
+    location, _, _ = find_best_match_template(enhance_captcha_image(sample["background"]),
+                                              enhance_captcha_image(sample["puzzle"]),
+                                              y_hint=y_hint, pyramid_levels=pyramid_levels)
+    return solver.image_x_to_slider_offset(location[0], meta["puzzle_left"],
+                                           sample["background"].shape[1], sample["puzzle"].shape[1])
+
+
+METHODS = {
+    "calculate_precise_offset": predict_precise_offset,
+    # То же, что решатель с CAPTCHA_PYRAMID_LEVELS=1
+    "precise_offset_pyramid": lambda sample: predict_precise_offset(sample, pyramid_levels=1),
+    # Полный перебор трёх методов на полном разрешении — базовая линия
+    "find_best_match_template": predict_best_match_template,
+    "template_pyramid": lambda sample: predict_best_match_template(sample, pyramid_levels=1),
+    "template_pyramid_band": lambda sample: predict_best_match_template(sample, pyramid_levels=1,
+                                                                        use_row_band=True),
+}
+
+
+def evaluate(samples, method, tolerance):
+    """Возвращает (попаданий, ошибки по образцам, мс на решение)"""
+    hits = 0
+    errors = []
+    timings = []
+
+    for sample in samples:
+        start = time.perf_counter()
+        predicted = method(sample)
+        timings.append((time.perf_counter() - start) * 1000)
+
+        if predicted is None:
+            continue
+
+        error = abs(predicted - sample["meta"]["solved_offset"])
+        errors.append(error)
+        if error <= tolerance:
+            hits += 1
+
+    return hits, errors, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-оценка решателя капчи Ozon")
+    parser.add_argument("corpus_dir", nargs="?", default=settings.CAPTCHA_CORPUS_DIR)
+    parser.add_argument("--tolerance", type=float, default=6.0,
+                        help="допуск по смещению слайдера, px")
+    parser.add_argument("--method", choices=sorted(METHODS), action="append",
+                        help="оценить только указанные методы")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # Меряем чистое время оценки, без передачи изображений в пул процессов
+    settings.CAPTCHA_POOL_SIZE = 0
+
+    samples = list(load_corpus(args.corpus_dir))
+    labeled = [s for s in samples if s["meta"].get("solved_offset") is not None]
+
+    print(f"📂 Корпус: {args.corpus_dir}")
+    print(f"📦 Образцов: {len(samples)}, с известным решением: {len(labeled)}")
+    if not labeled:
+        print("❌ Нет образцов с решением. Включите SAVE_CAPTCHA_SAMPLES и соберите корпус.")
+        return
+
+    print("=" * 78)
+    print(f"{'Метод':<28}{'попаданий':>12}{'доля':>9}{'ср. ошибка':>13}{'мс/решение':>14}")
+    for name in args.method or list(METHODS):
+        hits, errors, timings = evaluate(labeled, METHODS[name], args.tolerance)
+        mean_error = f"{mean(errors):.1f}" if errors else "-"
+        print(f"{name:<28}{hits:>7}/{len(labeled):<4}{hits / len(labeled) * 100:>8.1f}%"
+              f"{mean_error:>13}{mean(timings):>14.2f}")
+    print("=" * 78)
+    print(f"Допуск: ±{args.tolerance:g}px смещения слайдера")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Общие данные для бенчмарков: результаты парсинга на основе result.json
+"""
+
+import json
+import os
+from typing import List
+
+from models.schemas import ArticleResult, ParseResponse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_FIXTURE = os.path.join(ROOT_DIR, "result.json")
+
+
+def load_sample_results(count: int) -> List[ArticleResult]:
+    """
+    Возвращает count результатов, циклически повторяя записи из result.json
+    (артикулы делаем уникальными, как в реальном батче)
+    """
+    with open(RESULT_FIXTURE, "r", encoding="utf-8") as f:
+        recorded = json.load(f)["results"]
+
+    results = []
+    for i in range(count):
+        item = dict(recorded[i % len(recorded)])
+        item["article"] = item["article"] + i // len(recorded)
+        results.append(ArticleResult(**item))
+    return results
+
+
+def build_sample_response(count: int) -> ParseResponse:
+    results = load_sample_results(count)
+    successful = [r for r in results if r.success]
+    return ParseResponse(
+        success=bool(successful),
+        total_articles=len(results),
+        parsed_articles=len(successful),
+        results=results,
+        errors=[r.error for r in results if not r.success and r.error]
+    )
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Локальная замена Ozon для сквозных бенчмарков без сети.
+
+Отдаёт:
+- главную страницу;
+- composer-api.bx/page/json/v2?url=/product/<id>/ с widgetStates, собранными из result.json;
+- с заданной вероятностью — страницу антибота («Доступ ограничен») или слайдер-капчу
+  с той же разметкой, что у Ozon (#captcha, #image, #puzzle, #slider-container, #slider).
+  Капча проверяет смещение слайдера; после решения клиент получает куку и
+  какое-то время капчи не видит;
+- витрину главной: assets картинок по asset_kb КБ и веб-шрифт, как тяжёлую главную Ozon
+  (для оценки блокировки запросов BLOCK_REQUESTS);
+- искусственную задержку ответа.
+
+Запуск из корня проекта:
+    python -m benchmarks.mock_ozon [--port 8900] [--latency-ms 150] [--captcha-rate 0.05]
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import mimetypes
+import random
+import time
+import uuid
+from urllib.parse import quote
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+from PIL import Image
+
+from benchmarks.fixtures import RESULT_FIXTURE
+
+API_PATH = "/api/composer-api.bx/page/json/v2"
+CAPTCHA_PATH = "/__rr/antibot"
+PASS_COOKIE = "mock_antibot_pass"
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 150.0
+    jitter_ms: float = 50.0
+    antibot_rate: float = 0.0
+    captcha_rate: float = 0.0
+    # Сколько секунд после решённой капчи клиент её не видит
+    pass_ttl: float = 120.0
+    # Допуск по смещению слайдера, px
+    tolerance: float = 8.0
+    # Картинки витрины на главной и их размер
+    assets: int = 0
+    asset_kb: int = 50
+
+
+def format_price(value: Optional[int]) -> Optional[str]:
+    """Цена в виде, как её отдаёт Ozon: '73 465 ₽'"""
+    if value is None:
+        return None
+    return f"{value:,}".replace(",", " ") + " ₽"
+
+
+def load_fixture_records():
+    with open(RESULT_FIXTURE, "r", encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def build_composer_payload(record: Dict, article: int) -> Dict:
+    """widgetStates в формате composer-api; для неуспешных записей фикстуры — без webPrice"""
+    widget_states = {
+        "webGallery-3311626-default-1": json.dumps({"images": []}),
+    }
+    if record.get("success"):
+        price_info = record.get("price_info") or {}
+        widget_states["webPrice-3121879-default-1"] = json.dumps({
+            "isAvailable": record.get("isAvailable", True),
+            "cardPrice": format_price(price_info.get("cardPrice")),
+            "price": format_price(price_info.get("price")),
+            "originalPrice": format_price(price_info.get("originalPrice")),
+        }, ensure_ascii=False)
+        if record.get("title"):
+            widget_states["webProductHeading-3385933-default-1"] = json.dumps(
+                {"title": record["title"]}, ensure_ascii=False)
+        if record.get("seller"):
+            widget_states["webStickyProducts-726428-default-1"] = json.dumps(
+                {"seller": record["seller"]}, ensure_ascii=False)
+    return {"widgetStates": widget_states, "layoutTrackingInfo": json.dumps({"sku": article})}
+
+
+def make_captcha_images(rng: np.random.Generator, width: int = 340, height: int = 200, piece: int = 60):
+    """Фон с вырезом и пазл во всю высоту фона (как у Ozon). Возвращает (bg_png, puzzle_png, x, y)"""
+    noise = (rng.random((height // 8, width // 8, 3)) * 255).astype(np.uint8)
+    bg = cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+    bg = np.clip(bg.astype(int) + rng.integers(-20, 20, (height, width, 3)), 0, 255).astype(np.uint8)
+
+    x = int(rng.integers(piece + 20, width - piece - 5))
+    y = int(rng.integers(10, height - piece - 10))
+    mask = np.zeros((piece, piece), np.uint8)
+    cv2.rectangle(mask, (8, 8), (piece - 9, piece - 9), 255, -1)
+    cv2.circle(mask, (piece // 2, 8), 8, 255, -1)
+    cv2.circle(mask, (piece - 9, piece // 2), 8, 255, -1)
+
+    puzzle = np.zeros((height, piece, 4), np.uint8)
+    puzzle[y:y + piece, :, :3] = bg[y:y + piece, x:x + piece]
+    puzzle[y:y + piece, :, 3] = mask
+
+    hole = bg[y:y + piece, x:x + piece]
+    hole[mask > 0] = (hole[mask > 0] * 0.45).astype(np.uint8)
+
+    def to_png(array):
+        buffer = io.BytesIO()
+        Image.fromarray(array).save(buffer, format="PNG")
+        return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    return to_png(bg), to_png(puzzle), x, y
+
+
+CAPTCHA_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Antibot Captcha</title>
+<style>
+  #captcha {{ position: relative; width: {view_width}px; }}
+  #image {{ width: {view_width}px; height: {view_height}px; display: block; }}
+  #puzzle {{ position: absolute; width: {piece_view}px; height: {view_height}px; }}
+  #slider-container {{ position: relative; width: {container}px; height: 40px; background: #eee; margin-top: 8px; }}
+  #slider {{ position: absolute; left: 0; top: 0; width: 40px; height: 40px; background: #005bff; cursor: pointer; }}
+</style></head>
+<body>
+<div id="captcha-container">
+  <p>Confirm that you're not a bot</p>
+  <div id="captcha" style="--scale: {scale};">
+    <img id="image" src="data:image/png;base64,{bg}">
+    <img id="puzzle" src="data:image/png;base64,{puzzle}" style="left: {left}px; top: 0px;">
+  </div>
+  <div id="slider-container"><div id="slider"></div></div>
+  <div id="hint">Slide the slider to complete the puzzle</div>
+</div>
+<script>
+  var slider = document.getElementById('slider');
+  var puzzle = document.getElementById('puzzle');
+  var container = {container}, maxPuzzle = {max_puzzle_view}, startLeft = {left};
+  var dragging = false, startX = 0, offset = 0;
+  slider.addEventListener('mousedown', function(e) {{ dragging = true; startX = e.clientX; offset = 0; }});
+  document.addEventListener('mousemove', function(e) {{
+    if (!dragging) return;
+    offset = Math.max(0, Math.min(container - 40, e.clientX - startX));
+    slider.style.left = offset + 'px';
+    puzzle.style.left = (startLeft + offset / container * maxPuzzle) + 'px';
+  }});
+  document.addEventListener('mouseup', function() {{
+    if (!dragging) return;
+    dragging = false;
+    fetch('/__rr/verify', {{method: 'POST', headers: {{'Content-Type': 'application/json'}},
+      body: JSON.stringify({{token: '{token}', offset: offset}})}})
+      .then(function(r) {{ return r.json(); }})
+      .then(function(d) {{
+        if (d.ok) {{
+          document.getElementById('hint').innerText = 'Success';
+          window.location.href = {ret};
+        }} else {{
+          slider.style.left = '0px';
+          puzzle.style.left = startLeft + 'px';
+        }}
+      }});
+  }});
+</script>
+</body></html>
+"""
+
+ANTIBOT_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Доступ ограничен</title></head>
+<body><h1>Доступ ограничен</h1><p>Инцидент: {incident}</p></body></html>
+"""
+
+HOME_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>OZON — интернет-магазин</title>{head}</head>
+<body><h1>OZON</h1><p>Mock homepage for benchmarks</p>{body}</body></html>
+"""
+FONT_STYLE = """<style>@font-face {{ font-family: OzonSans; src: url(/static/ozon-sans.woff2); }}
+body {{ font-family: OzonSans; }}</style>"""
+
+
+def render_home(assets: int) -> str:
+    if not assets:
+        return HOME_PAGE.format(head="", body="")
+    images = "".join(f'<img src="/static/banner-{index}.jpg" width="300" height="150">' for index in range(assets))
+    return HOME_PAGE.format(head=FONT_STYLE.format(), body=images)
+
+
+def create_app(config: MockConfig, seed: Optional[int] = None) -> FastAPI:
+    app = FastAPI(title="Mock Ozon", docs_url=None, redoc_url=None)
+    records = load_fixture_records()
+    rng = np.random.default_rng(seed)
+    random_gen = random.Random(seed)
+    # token -> ожидаемое смещение слайдера; session id -> срок действия прохода
+    pending_captchas: Dict[str, float] = {}
+    passes: Dict[str, float] = {}
+    stats = {"requests": 0, "antibot": 0, "captcha": 0, "captcha_solved": 0, "captcha_failed": 0,
+             "asset_bytes": 0}
+    # Несжимаемое тело ассета, как у картинок
+    asset_body = rng.bytes(config.asset_kb * 1024)
+    asset_body_size = len(asset_body)
+    app.state.stats = stats
+
+    async def delay():
+        latency = config.latency_ms + random_gen.uniform(-config.jitter_ms, config.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    def has_pass(request: Request) -> bool:
+        expires = passes.get(request.cookies.get(PASS_COOKIE, ""))
+        return expires is not None and expires > time.time()
+
+    def maybe_block(request: Request):
+        """Страница антибота или редирект на капчу — либо None"""
+        stats["requests"] += 1
+        if has_pass(request):
+            return None
+
+        roll = random_gen.random()
+        if roll < config.antibot_rate:
+            stats["antibot"] += 1
+            return HTMLResponse(ANTIBOT_PAGE.format(incident=uuid.uuid4().hex[:16]), status_code=403)
+        if roll < config.antibot_rate + config.captcha_rate:
+            stats["captcha"] += 1
+            ret = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+            return RedirectResponse(f"{CAPTCHA_PATH}?ret={quote(ret, safe='/')}", status_code=302)
+        return None
+
+    @app.get("/")
+    async def home(request: Request):
+        await delay()
+        return maybe_block(request) or HTMLResponse(render_home(config.assets))
+
+    @app.get("/static/{name}")
+    async def static_asset(name: str):
+        await delay()
+        stats["asset_bytes"] += asset_body_size
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        return Response(asset_body, media_type=media_type)
+
+    @app.get(API_PATH)
+    async def composer(request: Request, url: str = ""):
+        await delay()
+        blocked = maybe_block(request)
+        if blocked:
+            return blocked
+
+        try:
+            article = int(url.strip("/").split("/")[-1].split("-")[-1])
+        except ValueError:
+            return JSONResponse({"error": "unknown url"}, status_code=404)
+        return JSONResponse(build_composer_payload(records[article % len(records)], article))
+
+    @app.get(CAPTCHA_PATH)
+    async def captcha(ret: str = "/"):
+        await delay()
+        scale, container, left, piece = 1.28, 480, 11, 60
+        bg, puzzle, x, _ = make_captcha_images(rng, piece=piece)
+        width, height = 340, 200
+
+        # Смещение слайдера, при котором пазл встаёт в вырез (та же формула, что у решателя)
+        expected = (x - left / scale) / (width - piece) * container
+        token = uuid.uuid4().hex
+        pending_captchas[token] = expected
+
+        return HTMLResponse(CAPTCHA_PAGE.format(
+            view_width=int(width * scale), view_height=int(height * scale), piece_view=int(piece * scale),
+            max_puzzle_view=(width - piece) * scale, container=container, scale=scale, left=left,
+            bg=bg, puzzle=puzzle, token=token, ret=json.dumps(ret)
+        ))
+
+    @app.post("/__rr/verify")
+    async def verify(request: Request):
+        data = await request.json()
+        expected = pending_captchas.pop(data.get("token"), None)
+        ok = expected is not None and abs(float(data.get("offset", 0)) - expected) <= config.tolerance
+        stats["captcha_solved" if ok else "captcha_failed"] += 1
+
+        response = JSONResponse({"ok": ok})
+        if ok:
+            session = uuid.uuid4().hex
+            passes[session] = time.time() + config.pass_ttl
+            response.set_cookie(PASS_COOKIE, session)
+        return response
+
+    @app.get("/__stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный mock Ozon для бенчмарков")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=MockConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=MockConfig.jitter_ms)
+    parser.add_argument("--antibot-rate", type=float, default=MockConfig.antibot_rate)
+    parser.add_argument("--captcha-rate", type=float, default=MockConfig.captcha_rate)
+    parser.add_argument("--pass-ttl", type=float, default=MockConfig.pass_ttl)
+    parser.add_argument("--assets", type=int, default=MockConfig.assets)
+    parser.add_argument("--asset-kb", type=int, default=MockConfig.asset_kb)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                        antibot_rate=args.antibot_rate, captcha_rate=args.captcha_rate,
+                        pass_ttl=args.pass_ttl, assets=args.assets, asset_kb=args.asset_kb)
+    print(f"🧪 Mock Ozon: http://{args.host}:{args.port}")
+    print(f"   OZON_BASE_URL=http://{args.host}:{args.port}")
+    print(f"   OZON_API_URL=http://{args.host}:{args.port}{API_PATH}")
+    uvicorn.run(create_app(config, args.seed), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -8,10 +8,38 @@ class Settings(BaseSettings):
     API_PORT: int = 8000
     API_DEBUG: bool = True
     
+    # Logging settings
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json или text
+    # Доля INFO/DEBUG-записей горячего цикла (помеченных SAMPLED), которые попадают в лог, по логгерам
+    LOG_SAMPLING: Dict[str, float] = {
+        "driver_manager.selenium_manager": 0.1,
+        "parser.ozon_parser": 0.25,
+    }
+    
+    # Response settings
+    RESPONSE_COMPRESSION: bool = True  # gzip/brotli по Accept-Encoding
+    COMPRESSION_MIN_SIZE: int = 1024  # байт, меньшие ответы не сжимаем
+    
     # Selenium settings
     HEADLESS: bool = False
     IMPLICIT_WAIT: int = 20
     PAGE_LOAD_TIMEOUT: int = 60
+    # Облегчённый профиль: без картинок, шрифтов и медиа, меньше рендереров и окно, кэш на tmpfs
+    LOW_MEMORY_BROWSER: bool = False
+    LOW_MEMORY_WINDOW_SIZE: str = "800,600"
+    LOW_MEMORY_RENDERER_LIMIT: int = 2
+    LOW_MEMORY_DISK_CACHE_MB: int = 64
+    BROWSER_CACHE_DIR: str = "/dev/shm"  # tmpfs для дискового кэша; если папки нет — системная временная
+    CHROME_NET_LOG_DIR: Optional[str] = None  # папка для net-log Chrome (отладка); None — не писать
+    # Блокировка лишних запросов при прогреве и переходе на composer-api (CDP Network.setBlockedURLs / page.route)
+    BLOCK_REQUESTS: bool = False  # включать после прогона бенчмарка: не растёт ли доля капч и блокировок
+    BLOCKED_RESOURCE_TYPES: List[str] = ["image", "font", "media"]  # для Selenium — по расширениям в URL
+    BLOCKED_URL_PATTERNS: List[str] = [
+        "*mc.yandex.ru*", "*top-fwz1.mail.ru*", "*google-analytics.com*",
+        "*googletagmanager.com*", "*doubleclick.net*",
+    ]
+    NETWORK_ACCOUNTING: bool = True  # считать байты по воркерам из сетевых событий CDP
     
     # Ozon settings
     OZON_BASE_URL: str = "https://www.ozon.ru"
@@ -26,13 +54,47 @@ class Settings(BaseSettings):
     # Worker settings - динамическое распределение
     MAX_ARTICLES_PER_WORKER: int = 30  # Увеличено
     MAX_WORKERS: int = 5  # Увеличено до 7
+    DRIVER_MAX_RSS_MB: int = 1500  # пересоздать драйвер, когда его дерево процессов Chrome больше; 0 — не следить
+    DRIVER_MAX_ARTICLES: int = 0  # пересоздать драйвер после стольких артикулов; 0 — без лимита
+    STANDBY_DRIVERS: int = 0  # максимум запасных прогретых драйверов для новых воркеров; 0 — выключено
+    STANDBY_DEMAND_WINDOW: int = 900  # секунд истории запусков воркеров, по которой пул выбирает число запасных
+    STANDBY_MAX_AGE: int = 1800  # секунд до замены неиспользованного запасного драйвера (сессия стареет)
     
     # Browser settings
     USER_AGENT: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
 
+    # Captcha settings
+    CAPTCHA_CONFIDENCE_THRESHOLD: float = 0.4  # ниже — пробуем несколько смещений вокруг оценки
+    SAVE_CAPTCHA_SAMPLES: bool = False  # сохранять пары изображений капчи и сработавшее смещение
+    CAPTCHA_CORPUS_DIR: str = "captcha_corpus"
+    CAPTCHA_POOL_SIZE: int = 2  # процессов для OpenCV; 0 — считать в потоке воркера
+    CAPTCHA_POOL_TIMEOUT: int = 15  # секунд на одну оценку в пуле
+    CAPTCHA_PYRAMID_LEVELS: int = 0  # уровней пирамиды для поиска пазла от грубого к точному; 0 — полный перебор
+    CAPTCHA_STATS_PATH: str = "config/captcha_offset_stats.json"  # статистика удачных смещений
+    RECOVERY_POLICY_ENABLED: bool = True  # выбирать между решением капчи и сменой сессии по времени
+    RECOVERY_EXPLORATION: float = 0.1  # доля случайных стратегий, чтобы оценки оставались свежими
+
     # Proxy settings
     ENABLE_PROXY: bool = True
     PROXY_LIST_PATH: str = "config/proxies.txt"
+    PROXY_RELOAD_INTERVAL: int = 5  # секунд между проверками изменения файла прокси; 0 — не следить
+    PROXY_CHECK_INTERVAL: int = 60  # секунд между фоновыми проверками; 0 — не проверять
+    PROXY_CHECK_TIMEOUT: int = 10
+    PROXY_CHECK_URL: str = "https://www.google.com/generate_204"
+    PROXY_MAX_CONSECUTIVE_FAILURES: int = 3  # после стольких неудач подряд прокси не выбирается
+    PROXY_QUARANTINE_COOLDOWN: int = 300  # секунд карантина после последней неудачи, затем прокси пробуется снова
+    PROXY_RATE_PER_MINUTE: float = 20.0  # запросов к Ozon в минуту на прокси; 0 — без лимита
+    PROXY_BURST: int = 3  # сколько запросов подряд можно сделать без ожидания
+    PROXY_DAILY_BUDGET_MB: float = 0  # трафика в сутки на прокси; 0 — без бюджета
+    BUDGET_SAVER_THRESHOLD: float = 0.8  # с этой доли бюджета воркер берёт кэш и fetch в странице вместо навигации
+    COMPOSER_CACHE_TTL: int = 900  # секунд, сколько ответ composer-api годен для экономного режима
+    COMPOSER_CACHE_SIZE: int = 2000  # артикулов в кэше ответов
+    ADMIN_TOKEN: Optional[str] = None  # заголовок X-Admin-Token для изменения прокси через API; None — изменение выключено
+
+    # Session settings
+    SESSION_AFFINITY: bool = True  # сохранять куки/localStorage по прокси и восстанавливать в новых драйверах
+    SESSION_STORE_DIR: str = "sessions"
+    SESSION_MAX_AGE: int = 21600  # секунд, старые сессии не восстанавливаются
     CHROME_BINARY: Optional[str] = None
 
     class Config:
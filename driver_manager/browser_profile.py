@@ -0,0 +1,85 @@
+import logging
+import os
+import tempfile
+import time
+from typing import List, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Флаги Chrome, которые не нужны для получения JSON composer-api и только занимают память
+LOW_MEMORY_ARGS = [
+    # Картинки не загружаются страницей; решатель капчи забирает их через fetch
+    "--blink-settings=imagesEnabled=false",
+    "--disable-remote-fonts",
+    "--autoplay-policy=user-gesture-required",
+    "--mute-audio",
+    # Без изоляции сайтов --renderer-process-limit действительно ограничивает число рендереров
+    "--disable-features=IsolateOrigins,site-per-process,Translate,OptimizationHints,MediaRouter",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-breakpad",
+    "--no-first-run",
+]
+
+
+# CDP Network.setBlockedURLs фильтрует только по URL: типы ресурсов переводим в расширения файлов
+RESOURCE_TYPE_EXTENSIONS = {
+    "image": ["jpg", "jpeg", "png", "gif", "webp", "avif", "svg", "ico"],
+    "font": ["woff", "woff2", "ttf", "otf", "eot"],
+    "media": ["mp4", "webm", "m3u8", "mp3", "ogg"],
+    "stylesheet": ["css"],
+}
+
+
+def extension_patterns(extension: str) -> List[str]:
+    """
+    Шаблоны для пути, который заканчивается на .extension (с query-строкой или без).
+    '*' в setBlockedURLs — любая подстрока, поэтому расширение привязываем к концу URL или к '?',
+    а не ищем где угодно в URL (иначе блокируются и адреса, где «.png» встречается в пути или параметрах)
+    """
+    return [f"*.{extension}", f"*.{extension}?*"]
+
+
+def blocked_url_patterns() -> List[str]:
+    """Шаблоны URL для Network.setBlockedURLs: BLOCKED_URL_PATTERNS и типы ресурсов"""
+    if not settings.BLOCK_REQUESTS:
+        return []
+    patterns = list(settings.BLOCKED_URL_PATTERNS)
+    for resource_type in settings.BLOCKED_RESOURCE_TYPES:
+        for extension in RESOURCE_TYPE_EXTENSIONS.get(resource_type, []):
+            patterns.extend(extension_patterns(extension))
+    return patterns
+
+
+def low_memory_args(disk_cache_dir: Optional[str]) -> List[str]:
+    """Флаги облегчённого профиля браузера"""
+    args = list(LOW_MEMORY_ARGS)
+    args.append(f"--renderer-process-limit={settings.LOW_MEMORY_RENDERER_LIMIT}")
+    if disk_cache_dir:
+        args.append(f"--disk-cache-dir={disk_cache_dir}")
+        args.append(f"--disk-cache-size={settings.LOW_MEMORY_DISK_CACHE_MB * 1024 * 1024}")
+    return args
+
+
+def window_size() -> str:
+    return settings.LOW_MEMORY_WINDOW_SIZE if settings.LOW_MEMORY_BROWSER else "1920,1080"
+
+
+def make_disk_cache_dir() -> str:
+    """Отдельный дисковый кэш драйвера на tmpfs (BROWSER_CACHE_DIR), если он есть"""
+    base_dir = settings.BROWSER_CACHE_DIR if os.path.isdir(settings.BROWSER_CACHE_DIR) else None
+    return tempfile.mkdtemp(prefix="ozon_chrome_cache_", dir=base_dir)
+
+
+def net_log_args() -> List[str]:
+    """net-log только для отладки: отдельный файл на каждый драйвер в CHROME_NET_LOG_DIR"""
+    if not settings.CHROME_NET_LOG_DIR:
+        return []
+    os.makedirs(settings.CHROME_NET_LOG_DIR, exist_ok=True)
+    path = os.path.join(settings.CHROME_NET_LOG_DIR, f"netlog_{os.getpid()}_{time.time_ns()}.json")
+    logger.info("Chrome net log: %s", path)
+    return [f"--log-net-log={path}", "--net-log-capture-mode=Everything"]
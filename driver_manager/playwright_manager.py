@@ -6,11 +6,14 @@ import os
 import time
 import json
 import re
-from typing import Optional
+from typing import Optional, Tuple
 from playwright.sync_api import sync_playwright, Browser, Page, BrowserContext
 from config.settings import settings
 from utils.proxy_manager import proxy_manager, ProxyInfo
+from utils.rate_limiter import rate_limiter
+from driver_manager.browser_profile import low_memory_args, make_disk_cache_dir, net_log_args
 import shutil
+from fnmatch import fnmatch
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +26,12 @@ class PlaywrightSyncManager:
         self.proxy: Optional[ProxyInfo] = None
         self._proxy_auth_dir: Optional[str] = None
         self._user_data_dir: Optional[str] = None
+        self._disk_cache_dir: Optional[str] = None
         self.playwright = None
+        # Трафик страницы и заблокированные запросы; _reported — уже отданное collect_network_stats
+        self.bytes_received = 0
+        self.requests_blocked = 0
+        self._reported = (0, 0)
 
     def get_random_user_agent(self) -> str:
         """Возвращает случайный User-Agent"""
@@ -101,6 +109,10 @@ class PlaywrightSyncManager:
                     f"--window-size={random.randint(1200, 1920)},{random.randint(800, 1080)}",
                 ]
             }
+            launch_options["args"].extend(net_log_args())
+            if settings.LOW_MEMORY_BROWSER:
+                self._disk_cache_dir = make_disk_cache_dir()
+                launch_options["args"].extend(low_memory_args(self._disk_cache_dir))
 
             # Выбираем прокси
             self.proxy = proxy_manager.get_random_proxy()
@@ -144,6 +156,7 @@ class PlaywrightSyncManager:
 
             # Создаем страницу
             self.page = self.context.new_page()
+            self._setup_request_blocking()
 
             # Устанавливаем заголовки
             self.page.set_extra_http_headers({
@@ -164,6 +177,39 @@ class PlaywrightSyncManager:
             self.close()
             raise
 
+    def _setup_request_blocking(self):
+        """Блокирует типы ресурсов и URL из настроек через page.route, считает полученные байты"""
+        if settings.BLOCK_REQUESTS and (settings.BLOCKED_RESOURCE_TYPES or settings.BLOCKED_URL_PATTERNS):
+            blocked_types = set(settings.BLOCKED_RESOURCE_TYPES)
+
+            def handle_route(route):
+                request = route.request
+                if request.resource_type in blocked_types or any(
+                        fnmatch(request.url, pattern) for pattern in settings.BLOCKED_URL_PATTERNS):
+                    self.requests_blocked += 1
+                    route.abort("blockedbyclient")
+                else:
+                    route.continue_()
+
+            self.page.route("**/*", handle_route)
+
+        if settings.NETWORK_ACCOUNTING:
+            self.page.on("requestfinished", self._count_request_bytes)
+
+    def _count_request_bytes(self, request):
+        try:
+            sizes = request.sizes()
+            self.bytes_received += sizes["responseHeadersSize"] + sizes["responseBodySize"]
+        except Exception as e:
+            logger.debug(f"Could not read request sizes: {e}")
+
+    def collect_network_stats(self) -> Tuple[int, int]:
+        """(получено байт, заблокировано запросов) с прошлого вызова"""
+        received = self.bytes_received - self._reported[0]
+        blocked = self.requests_blocked - self._reported[1]
+        self._reported = (self.bytes_received, self.requests_blocked)
+        return received, blocked
+
     def check_ip(self):
         """Проверяет внешний IP адрес"""
         try:
@@ -182,6 +228,7 @@ class PlaywrightSyncManager:
                 if attempt > 0:
                     time.sleep(random.uniform(2, 4))
 
+                rate_limiter.acquire(self.proxy)
                 self.page.goto(url, wait_until="networkidle", timeout=30000)
 
                 # Проверяем на блокировку
@@ -323,6 +370,10 @@ class PlaywrightSyncManager:
             if self._user_data_dir and os.path.exists(self._user_data_dir):
                 shutil.rmtree(self._user_data_dir, ignore_errors=True)
 
+            if self._disk_cache_dir:
+                shutil.rmtree(self._disk_cache_dir, ignore_errors=True)
+                self._disk_cache_dir = None
+
             logger.info("Playwright browser closed successfully")
 
         except Exception as e:
@@ -8,7 +8,8 @@ from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium_stealth import stealth
 from config.settings import settings
-from typing import Optional
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
 import time
 import json
 import random
@@ -18,6 +19,13 @@ import tempfile
 import shutil
 import undetected_chromedriver as uc
 from utils.proxy_manager import proxy_manager, ProxyInfo
+from utils.rate_limiter import rate_limiter
+from utils.session_store import session_store
+from utils.helpers import is_valid_json_response
+from utils.logging_setup import SAMPLED
+from driver_manager.browser_profile import (
+    blocked_url_patterns, low_memory_args, make_disk_cache_dir, net_log_args, window_size
+)
 import textwrap
 
 logger = logging.getLogger(__name__)
@@ -30,6 +38,17 @@ class SeleniumManager:
         self.wait: Optional[WebDriverWait] = None
         self.proxy: Optional[ProxyInfo] = None
         self._proxy_ext_dir: Optional[str] = None
+        self._disk_cache_dir: Optional[str] = None
+        # Сумма намеренных пауз, для разбивки времени навигации (debug_timings)
+        self.sleep_total = 0.0
+        # Блокировка запросов включена; трафик браузера по событиям CDP
+        self._blocking = False
+        self.bytes_received = 0
+        self.requests_blocked = 0
+
+    def _sleep(self, seconds: float) -> None:
+        self.sleep_total += seconds
+        time.sleep(seconds)
 
     def build_proxy_auth_extension_dir(self, username: str, password: str) -> str:
         """
@@ -224,7 +243,13 @@ class SeleniumManager:
 
         return plugin_path
 
-    def setup_driver(self):
+    def setup_driver(self, proxy: Optional[ProxyInfo] = None, exclude_proxy: Optional[ProxyInfo] = None,
+                     keep_connection: bool = False):
+        """
+        proxy — использовать конкретный прокси (пересоздание драйвера на той же сессии),
+        exclude_proxy — выбрать любой другой прокси (ротация),
+        keep_connection — не выбирать прокси: proxy=None означает прямое подключение.
+        """
         chrome_options = uc.ChromeOptions()
 
         if settings.HEADLESS:
@@ -232,9 +257,17 @@ class SeleniumManager:
 
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--log-net-log=/tmp/chrome_netlog.json")
-        chrome_options.add_argument("--net-log-capture-mode=Everything")
+        chrome_options.add_argument(f"--window-size={window_size()}")
+        for argument in net_log_args():
+            chrome_options.add_argument(argument)
+        if settings.LOW_MEMORY_BROWSER:
+            self._disk_cache_dir = make_disk_cache_dir()
+            for argument in low_memory_args(self._disk_cache_dir):
+                chrome_options.add_argument(argument)
+        if settings.NETWORK_ACCOUNTING:
+            # Сетевые события CDP в performance-лог: из них считаем полученные байты
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+            chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
         # chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_argument(
@@ -252,12 +285,12 @@ class SeleniumManager:
         else:
             logger.warning("Chrome binary not found via autodetect, relying on default lookup")
 
-        self.proxy = proxy_manager.get_random_proxy()
-
-        if self.proxy:
-            if not self.check_proxy_alive(self.proxy):
-                logger.warning("Selected proxy is not alive, falling back to direct connection")
-                self.proxy = None
+        # Живость прокси проверяется в фоне (proxy_manager.start_health_checks),
+        # мёртвые прокси сюда не попадают — запуск драйвера не ждёт проверки
+        if proxy or keep_connection:
+            self.proxy = proxy
+        else:
+            self.proxy = proxy_manager.get_random_proxy(exclude=exclude_proxy)
 
         if self.proxy:
             # 1) направляем трафик через прокси
@@ -283,6 +316,7 @@ class SeleniumManager:
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         self.driver = driver
         self.wait = WebDriverWait(driver, 20)
+        self.apply_request_blocking()
 
 
         logger.info("Chrome driver created successfully")
@@ -294,6 +328,19 @@ class SeleniumManager:
 
         return driver
 
+    def process_pids(self) -> List[int]:
+        """pid chromedriver и браузера — корни дерева процессов драйвера"""
+        pids = []
+        if self.driver:
+            service_process = getattr(getattr(self.driver, "service", None), "process", None)
+            if service_process is not None:
+                pids.append(service_process.pid)
+            # undetected_chromedriver запускает браузер сам, не через chromedriver
+            browser_pid = getattr(self.driver, "browser_pid", None)
+            if browser_pid:
+                pids.append(browser_pid)
+        return pids
+
     def _find_chrome_binary(self) -> Optional[str]:
         """Locate Chrome/Chromium executable.
 
@@ -314,17 +361,107 @@ class SeleniumManager:
 
         return None
 
+    def apply_request_blocking(self, enabled: bool = True) -> None:
+        """Блокирует картинки, шрифты, медиа и трекеры через CDP Network.setBlockedURLs"""
+        patterns = blocked_url_patterns() if enabled else []
+        if not self.driver or not (patterns or self._blocking):
+            return
+
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+            self._blocking = bool(patterns)
+        except Exception as e:
+            logger.warning("Failed to set blocked URLs: %s", e)
+
+    @contextmanager
+    def requests_unblocked(self):
+        """Снимает блокировку на время решения капчи: решателю нужны её картинки"""
+        blocking = self._blocking
+        if blocking:
+            self.apply_request_blocking(False)
+        try:
+            yield
+        finally:
+            if blocking:
+                self.apply_request_blocking(True)
+
+    def collect_network_stats(self) -> Tuple[int, int]:
+        """(получено байт, заблокировано запросов) с прошлого вызова — по performance-логу CDP"""
+        if not self.driver or not settings.NETWORK_ACCOUNTING:
+            return 0, 0
+
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception as e:
+            logger.debug("Failed to read performance log: %s", e)
+            return 0, 0
+
+        received = blocked = 0
+        for entry in entries:
+            raw = entry.get("message", "")
+            # Разбираем только нужные события — в логе их меньшинство
+            if "Network.loadingFinished" in raw:
+                try:
+                    received += int(json.loads(raw)["message"]["params"].get("encodedDataLength", 0))
+                except (ValueError, KeyError):
+                    continue
+            elif "Network.loadingFailed" in raw and "blockedReason" in raw:
+                blocked += 1
+
+        self.bytes_received += received
+        self.requests_blocked += blocked
+        return received, blocked
+
+    FETCH_SCRIPT = """
+        var done = arguments[arguments.length - 1];
+        fetch(arguments[0], {credentials: 'include', headers: {'Accept': 'application/json'}})
+            .then(function(r) { return r.text().then(function(text) { done({status: r.status, text: text}); }); })
+            .catch(function(e) { done({error: String(e)}); });
+    """
+
+    def on_ozon_page(self) -> bool:
+        """Открыта страница Ozon — fetch из неё пойдёт с куками сессии и без CORS"""
+        try:
+            return bool(self.driver) and self.driver.current_url.startswith(settings.OZON_BASE_URL)
+        except WebDriverException:
+            return False
+
+    def fetch_in_page(self, url: str, timeout: int = 30) -> Optional[str]:
+        """
+        Запрос composer-api через fetch() из открытой страницы Ozon: без навигации,
+        пауз и загрузки документа. None — не JSON (блокировка, капча) или ошибка.
+        """
+        if not self.driver:
+            return None
+
+        try:
+            rate_limiter.acquire(self.proxy)
+            self.driver.set_script_timeout(timeout)
+            result = self.driver.execute_async_script(self.FETCH_SCRIPT, url) or {}
+        except WebDriverException as e:
+            logger.warning("In-page fetch failed: %s", e)
+            return None
+
+        if result.get("error") or result.get("status") != 200:
+            logger.info("In-page fetch returned status=%s error=%s", result.get("status"), result.get("error"))
+            return None
+
+        text = result.get("text")
+        return text if text and is_valid_json_response(text) else None
+
     def navigate_to_url(self, url: str) -> bool:
         if not self.driver:
             logger.error("Driver not initialized")
             return False
 
         try:
-            logger.info("Navigating to: %s", url)
+            logger.info("Navigating to: %s", url, extra=SAMPLED)
+            rate_limiter.acquire(self.proxy)
             self.driver.get(url)
 
             # Минимальная задержка для API
-            time.sleep(random.uniform(3, 7))
+            self._sleep(random.uniform(3, 7))
 
             try:
                 title = self.driver.title
@@ -336,7 +473,7 @@ class SeleniumManager:
             except Exception as e:
                 logger.debug("Scroll JS failed: %s", e)
 
-            time.sleep(random.uniform(2, 4))
+            self._sleep(random.uniform(2, 4))
 
             current_url = None
             body_snippet = None
@@ -371,9 +508,11 @@ class SeleniumManager:
 
         except TimeoutException:
             logger.error(f"Timeout while loading: {url}")
+            proxy_manager.report_failure(self.proxy)
             return False
         except WebDriverException as e:
             logger.error(f"WebDriver error: {e}")
+            proxy_manager.report_failure(self.proxy)
             return False
 
     def is_blocked(self) -> bool:
@@ -451,6 +590,73 @@ class SeleniumManager:
         logger.info("Loaded %d cookies for domain %s", added, domain)
 
 
+    def save_session(self) -> None:
+        """Сохраняет куки всех доменов и localStorage текущего origin для текущего прокси"""
+        if not self.driver:
+            return
+
+        try:
+            try:
+                cookies = self.driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+            except Exception:
+                cookies = self.driver.get_cookies()
+
+            local_storage = {}
+            origin = self.driver.execute_script("return window.location.origin;")
+            if origin and origin.startswith("http"):
+                local_storage[origin] = self.driver.execute_script(
+                    "return Object.assign({}, window.localStorage);"
+                ) or {}
+
+            session_store.save(self.proxy, cookies, local_storage)
+        except Exception as e:
+            logger.warning("Failed to save browser session: %s", e)
+
+    def restore_session(self) -> bool:
+        """
+        Восстанавливает сохранённую сессию текущего прокси до первой навигации на Ozon:
+        куки через CDP, localStorage — скриптом, который выполняется до скриптов страницы.
+        """
+        if not self.driver:
+            return False
+
+        session = session_store.load(self.proxy)
+        if not session:
+            return False
+
+        try:
+            cookies = []
+            for cookie in session["cookies"]:
+                cookie = {key: value for key, value in cookie.items()
+                          if key in ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")}
+                # Сессионные куки CDP отдаёт с expires=-1, при установке его нужно опустить
+                if cookie.get("expires", 0) <= 0:
+                    cookie.pop("expires", None)
+                cookies.append(cookie)
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+
+            if session.get("local_storage"):
+                script = textwrap.dedent("""
+                (function(storage) {
+                    var items = storage[window.location.origin];
+                    if (!items) return;
+                    for (var key in items) {
+                        if (window.localStorage.getItem(key) === null) {
+                            window.localStorage.setItem(key, items[key]);
+                        }
+                    }
+                })(%s);
+                """) % json.dumps(session["local_storage"])
+                self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": script})
+
+            logger.info("Session restored for %s: %d cookies",
+                        self.proxy.browser_proxy if self.proxy else "direct", len(cookies))
+            return True
+        except Exception as e:
+            logger.warning("Failed to restore browser session: %s", e)
+            return False
+
     # Обновите selenium_manager.py
     def attempt_captcha_solution(self):
         """Пытается решить капчу Ozon с новым решателем"""
@@ -529,7 +735,7 @@ class SeleniumManager:
                         try:
                             data = json.loads(json_content)
                             if "widgetStates" in data:
-                                logger.info("JSON response with widgetStates found")
+                                logger.info("JSON response with widgetStates found", extra=SAMPLED)
                                 return json_content
                         except json.JSONDecodeError:
                             pass
@@ -699,6 +905,7 @@ class SeleniumManager:
             finally:
                 self.driver = None
                 self.wait = None
+                self._blocking = False
 
         # чистим временную директорию расширения
         if self._proxy_ext_dir:
@@ -710,3 +917,7 @@ class SeleniumManager:
                              self._proxy_ext_dir, e)
             finally:
                 self._proxy_ext_dir = None
+
+        if self._disk_cache_dir:
+            shutil.rmtree(self._disk_cache_dir, ignore_errors=True)
+            self._disk_cache_dir = None
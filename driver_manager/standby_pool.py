@@ -0,0 +1,202 @@
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Optional
+
+from config.settings import settings
+from driver_manager.selenium_manager import SeleniumManager
+from utils.metrics import STANDBY_DRIVERS, STANDBY_LEASES_TOTAL
+from utils.process_monitor import process_monitor
+from utils.proxy_manager import proxy_manager
+
+logger = logging.getLogger(__name__)
+
+# worker_id запасных драйверов в учёте процессов (/health, метрики)
+STANDBY_WORKER_ID = 0
+
+
+@dataclass
+class StandbyDriver:
+    manager: SeleniumManager
+    session_warm: bool
+    created: float = field(default_factory=time.time)
+    process_handle: Optional[int] = None
+
+
+class StandbyPool:
+    """
+    Запасные прогретые драйверы: запущенный Chrome с восстановленной или свежей сессией Ozon.
+    Воркер забирает готовый драйвер вместо запуска uc.Chrome, создания расширения и проверок IP,
+    а пул в фоне поднимает замену. Число запасных — пик запусков воркеров за demand_window
+    (не больше size): после простоя пул освобождает лишние Chrome.
+    """
+
+    # Пауза перед повторной попыткой, если драйвер не запускается (нет Chrome, сеть)
+    RETRY_DELAY = 30
+    # Запуски воркеров в пределах этого интервала считаются одним батчем
+    DEMAND_BURST = 60
+
+    def __init__(self, size: int, max_age: float, demand_window: float):
+        self.size = size
+        self.max_age = max_age
+        self.demand_window = demand_window
+        self._spares: Deque[StandbyDriver] = deque()
+        # Время каждого lease (попадания и промаха) — спрос на драйверы
+        self._demand: Deque[float] = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = time.time()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._spares)
+
+    def target(self) -> int:
+        """Сколько запасных держать: пик запусков воркеров в одном батче за demand_window"""
+        now = time.time()
+        with self._lock:
+            while self._demand and now - self._demand[0] > self.demand_window:
+                self._demand.popleft()
+            if not self._demand and now - self._started < self.demand_window:
+                # Истории ещё нет — держим максимум, пока не накопится статистика
+                return self.size
+            peak, first = 0, 0
+            for last, leased_at in enumerate(self._demand):
+                while leased_at - self._demand[first] > self.DEMAND_BURST:
+                    first += 1
+                peak = max(peak, last - first + 1)
+        return min(self.size, peak)
+
+    def _usable(self, spare: StandbyDriver) -> bool:
+        if time.time() - spare.created > self.max_age:
+            return False
+        # Прокси удалили или выводят из ротации, пока драйвер ждал
+        proxy = spare.manager.proxy
+        if proxy is not None and proxy_manager.proxy_states().get(proxy.key, "active") != "active":
+            return False
+        try:
+            return bool(spare.manager.driver) and spare.manager.driver.current_url is not None
+        except Exception:
+            return False
+
+    def _discard(self, spare: StandbyDriver) -> None:
+        process_monitor.unregister(spare.process_handle)
+        spare.manager.close()
+
+    def lease(self) -> Optional[StandbyDriver]:
+        """Готовый драйвер или None, если запасных нет; пул сразу начинает замену"""
+        with self._lock:
+            self._demand.append(time.time())
+        while True:
+            with self._lock:
+                spare = self._spares.popleft() if self._spares else None
+                STANDBY_DRIVERS.set(len(self._spares))
+            if spare is None:
+                STANDBY_LEASES_TOTAL.labels("miss").inc()
+                self._wake.set()
+                return None
+
+            if self._usable(spare):
+                process_monitor.unregister(spare.process_handle)
+                spare.process_handle = None
+                STANDBY_LEASES_TOTAL.labels("hit").inc()
+                self._wake.set()
+                return spare
+
+            logger.info("Discarding stale standby driver")
+            self._discard(spare)
+
+    def _warm(self, manager: SeleniumManager) -> bool:
+        """Восстанавливает сессию прокси и открывает главную Ozon; True — сессия прогрета"""
+        if settings.SESSION_AFFINITY:
+            manager.restore_session()
+        if not manager.navigate_to_url(settings.OZON_BASE_URL):
+            return False
+        time.sleep(2)  # даём озону поставить куки/сессию
+        if settings.SESSION_AFFINITY:
+            manager.save_session()
+        return True
+
+    def _create(self) -> Optional[StandbyDriver]:
+        manager = SeleniumManager()
+        try:
+            manager.setup_driver()
+            spare = StandbyDriver(manager=manager, session_warm=self._warm(manager))
+            # Трафик запуска и прогрева — прокси, но не будущему воркеру
+            received, _ = manager.collect_network_stats()
+            proxy_manager.report_bytes(manager.proxy, received)
+        except Exception as e:
+            logger.error(f"Failed to start standby driver: {e}")
+            manager.close()
+            return None
+        spare.process_handle = process_monitor.register(STANDBY_WORKER_ID, manager.process_pids())
+        logger.info(f"Standby driver ready (session_warm={spare.session_warm})")
+        return spare
+
+    def _expire(self, target: int) -> None:
+        """Заменяет устаревшие драйверы и закрывает лишние сверх target (самые старые)"""
+        with self._lock:
+            stale = [spare for spare in self._spares if time.time() - spare.created > self.max_age]
+            for spare in stale:
+                self._spares.remove(spare)
+            surplus = []
+            while len(self._spares) > target:
+                surplus.append(self._spares.popleft())
+            STANDBY_DRIVERS.set(len(self._spares))
+        for spare in stale:
+            logger.info("Recycling standby driver after %.0fs", time.time() - spare.created)
+            self._discard(spare)
+        for spare in surplus:
+            logger.info(f"Closing surplus standby driver (target {target})")
+            self._discard(spare)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            target = self.target()
+            self._expire(target)
+            if len(self) >= target:
+                self._wake.wait(timeout=min(self.max_age, 60))
+                self._wake.clear()
+                continue
+
+            # По одному драйверу за раз, чтобы замена не отнимала CPU у работающих воркеров
+            spare = self._create()
+            if spare is None:
+                self._stop.wait(self.RETRY_DELAY)
+                continue
+            if self._stop.is_set():
+                self._discard(spare)
+                break
+            with self._lock:
+                self._spares.append(spare)
+                STANDBY_DRIVERS.set(len(self._spares))
+
+    def start(self) -> None:
+        if self.size <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._started = time.time()
+        self._thread = threading.Thread(target=self._run, name="standby-drivers", daemon=True)
+        self._thread.start()
+        logger.info(f"Standby driver pool started: up to {self.size} spare drivers")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            # Запуск драйвера не прерывается — не ждём его дольше разумного
+            self._thread.join(timeout=10)
+            self._thread = None
+        with self._lock:
+            spares = list(self._spares)
+            self._spares.clear()
+            STANDBY_DRIVERS.set(0)
+        for spare in spares:
+            self._discard(spare)
+
+
+standby_pool = StandbyPool(settings.STANDBY_DRIVERS, settings.STANDBY_MAX_AGE, settings.STANDBY_DEMAND_WINDOW)
@@ -5,6 +5,7 @@
 
 import sys
 import os
+import multiprocessing
 
 # Добавляем текущую директорию в путь
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -13,6 +14,8 @@ try:
     from gui.gui_manager import main
     
     if __name__ == "__main__":
+        # Нужно для пула процессов капчи в собранном exe (PyInstaller)
+        multiprocessing.freeze_support()
         main()
         
 except ImportError as e:
@@ -1,10 +1,36 @@
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional, Set
 from config.settings import settings
 
 
+# Поля ArticleResult, которые клиент может запросить через `fields`.
+# article, success и error возвращаются всегда.
+PROJECTABLE_FIELDS = ('isAvailable', 'title', 'seller', 'price_info')
+
+# Колонки columnar-ответа, соответствующие полям ArticleResult
+COLUMNAR_FIELDS: Dict[str, tuple] = {
+    'isAvailable': ('isAvailable',),
+    'title': ('titles',),
+    'seller': ('sellers',),
+    'price_info': ('cardPrices', 'prices', 'originalPrices'),
+}
+
+
 class ArticlesRequest(BaseModel):
     articles: List[int] = Field(..., min_items=1, max_items=settings.MAX_ARTICLES_PER_REQUEST)
+    fields: Optional[List[str]] = Field(
+        None,
+        description="Поля результата через запятую, например 'price_info,isAvailable'. "
+                    "По умолчанию возвращаются все поля"
+    )
+    format: Literal['rows', 'columnar'] = Field(
+        'rows',
+        description="Формат ответа: 'rows' — список объектов, 'columnar' — параллельные массивы"
+    )
+    debug_timings: bool = Field(
+        False,
+        description="Добавить к каждому результату разбивку времени по этапам и сводку по запросу"
+    )
     
     @validator('articles')
     def validate_articles(cls, v):
@@ -12,6 +38,31 @@ class ArticlesRequest(BaseModel):
             raise ValueError('Articles list cannot be empty')
         return v
 
+    @validator('fields', pre=True)
+    def validate_fields(cls, v):
+        if v is None:
+            return v
+        if isinstance(v, str):
+            v = v.split(',')
+        fields = [str(field).strip() for field in v if str(field).strip()]
+        unknown = [field for field in fields if field not in PROJECTABLE_FIELDS]
+        if unknown:
+            raise ValueError(
+                f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(PROJECTABLE_FIELDS)}"
+            )
+        return fields or None
+
+    def requested_fields(self) -> Optional[Set[str]]:
+        """Набор запрошенных полей или None, если нужны все"""
+        return set(self.fields) if self.fields else None
+
+    def excluded_fields(self) -> Set[str]:
+        """Поля результата, которые нужно убрать из ответа"""
+        requested = self.requested_fields()
+        if requested is None:
+            return set()
+        return set(PROJECTABLE_FIELDS) - requested
+
 
 class SellerInfo(BaseModel):
     name: str
@@ -22,6 +73,46 @@ class PriceInfo(BaseModel):
     price: Optional[int] = None
     originalPrice: Optional[int] = None
 
+class TimingEvent(BaseModel):
+    """Этап обработки артикула; start — секунды от начала запроса"""
+    stage: str
+    attempt: int
+    start: float
+    duration: float
+    # Намеренные паузы внутри этапа (например, ожидание после навигации)
+    sleep: Optional[float] = None
+
+
+class ArticleTimings(BaseModel):
+    worker_id: int
+    started: float  # секунды от начала запроса до начала обработки артикула
+    total: float
+    attempts: int
+    stages: List[TimingEvent] = []
+    network_bytes: int = 0  # получено браузером за артикул, включая прогрев и повторы
+
+
+class WorkerTimings(BaseModel):
+    worker_id: int
+    started: float  # секунды от начала запроса до запуска воркера
+    # секунды от начала запроса до первого артикула воркера (после запуска драйвера); None — не начал
+    first_article: Optional[float] = None
+    driver_startup: float
+    articles: int
+    total: float
+    network_bytes: int = 0  # получено браузером, включая прогрев
+    blocked_requests: int = 0
+
+
+class RequestTimings(BaseModel):
+    total: float
+    # Самый долгий запуск драйвера и самое долгое ожидание до первого артикула воркера
+    driver_startup: float
+    queueing: float
+    slowest_worker: Optional[int] = None
+    workers: List[WorkerTimings] = []
+
+
 class ArticleResult(BaseModel):
     article: int
     success: bool
@@ -30,6 +121,10 @@ class ArticleResult(BaseModel):
     seller: Optional[SellerInfo] = None
     price_info: Optional[PriceInfo] = None
     error: Optional[str] = None
+    # True — ответ из кэша composer-api (режим экономии бюджета), cache_age — его возраст в секундах
+    cached: bool = False
+    cache_age: Optional[float] = None
+    timings: Optional[ArticleTimings] = None
 
 
 class ParseResponse(BaseModel):
@@ -37,4 +132,68 @@ class ParseResponse(BaseModel):
     total_articles: int
     parsed_articles: int
     results: List[ArticleResult]
-    errors: List[str] = []
\ No newline at end of file
+    errors: List[str] = []
+    timings: Optional[RequestTimings] = None
+
+
+class ColumnarResults(BaseModel):
+    """Результаты в виде параллельных массивов: i-й элемент каждой колонки относится к articles[i]"""
+    articles: List[int] = []
+    success: List[bool] = []
+    isAvailable: List[Optional[bool]] = []
+    titles: List[Optional[str]] = []
+    sellers: List[Optional[str]] = []
+    cardPrices: List[Optional[int]] = []
+    prices: List[Optional[int]] = []
+    originalPrices: List[Optional[int]] = []
+    cached: List[bool] = []
+    cacheAges: List[Optional[float]] = []
+    # Разреженный индекс ошибок: error_index[j] — номер строки, error_messages[j] — текст
+    error_index: List[int] = []
+    error_messages: List[str] = []
+    # Только при debug_timings
+    timings: Optional[List[Optional[ArticleTimings]]] = None
+
+
+class ColumnarParseResponse(BaseModel):
+    success: bool
+    total_articles: int
+    parsed_articles: int
+    format: str = 'columnar'
+    columns: ColumnarResults
+    errors: List[str] = []
+    timings: Optional[RequestTimings] = None
+
+    @classmethod
+    def from_parse_response(cls, response: ParseResponse) -> 'ColumnarParseResponse':
+        columns = ColumnarResults()
+        if response.timings is not None:
+            columns.timings = [result.timings for result in response.results]
+        for i, result in enumerate(response.results):
+            price_info = result.price_info
+            columns.articles.append(result.article)
+            columns.success.append(result.success)
+            columns.isAvailable.append(result.isAvailable)
+            columns.titles.append(result.title)
+            columns.sellers.append(result.seller.name if result.seller else None)
+            columns.cardPrices.append(price_info.cardPrice if price_info else None)
+            columns.prices.append(price_info.price if price_info else None)
+            columns.originalPrices.append(price_info.originalPrice if price_info else None)
+            columns.cached.append(result.cached)
+            columns.cacheAges.append(result.cache_age)
+            if result.error:
+                columns.error_index.append(i)
+                columns.error_messages.append(result.error)
+
+        return cls(
+            success=response.success,
+            total_articles=response.total_articles,
+            parsed_articles=response.parsed_articles,
+            columns=columns,
+            errors=response.errors,
+            timings=response.timings
+        )
+
+
+class ProxyAddRequest(BaseModel):
+    proxy: str = Field(..., description="Прокси в формате host:port:login:password[:запросов_в_минуту]")
@@ -16,6 +16,7 @@ const OZON_CONFIG = {
   BATCH_SIZE: 130,
   REQUEST_DELAY: 2000, // Задержка между батчами в миллисекундах
   MAX_RETRIES: 3,
+  RESPONSE_FORMAT: 'columnar', // 'rows' — массив объектов, 'columnar' — параллельные массивы (меньше трафика)
   HEADER_ROW: 2,
   DATA_START_ROW: 3,
   
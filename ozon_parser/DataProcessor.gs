@@ -1,6 +1,9 @@
 // OZON_DataProcessor.gs
 class OZON_DataProcessor {
   processOzonResponse(apiResponse) {
+    if (apiResponse.format === 'columnar') {
+      return this.processColumnarResponse(apiResponse);
+    }
     const results = [];
     apiResponse.results.forEach(result => {
       try {
@@ -23,6 +26,31 @@ class OZON_DataProcessor {
     return results;
   }
 
+  processColumnarResponse(apiResponse) {
+    const c = apiResponse.columns;
+    const pick = (column, i, fallback) => {
+      const value = column ? column[i] : null;
+      return value === null || value === undefined || value === '' ? fallback : value;
+    };
+    const results = c.articles.map((article, i) => {
+      const success = c.success[i];
+      return {
+        article: String(article),
+        title: success ? pick(c.titles, i, OZON_CONFIG.MESSAGES.NO_DATA) : OZON_CONFIG.MESSAGES.NO_DATA,
+        seller: success ? pick(c.sellers, i, OZON_CONFIG.MESSAGES.NO_DATA) : OZON_CONFIG.MESSAGES.NO_DATA,
+        cardPrice: success ? pick(c.cardPrices, i, OZON_CONFIG.MESSAGES.NO_PRICE_DATA) : OZON_CONFIG.MESSAGES.NO_PRICE_DATA,
+        price: success ? pick(c.prices, i, OZON_CONFIG.MESSAGES.NO_PRICE_DATA) : OZON_CONFIG.MESSAGES.NO_PRICE_DATA,
+        originalPrice: success ? pick(c.originalPrices, i, OZON_CONFIG.MESSAGES.NO_PRICE_DATA) : OZON_CONFIG.MESSAGES.NO_PRICE_DATA,
+        isAvailable: success ? Boolean(pick(c.isAvailable, i, false)) : false
+      };
+    });
+    (c.error_index || []).forEach((rowIndex, j) => {
+      Logger.log(`Ошибка для артикула ${c.articles[rowIndex]}: ${c.error_messages[j]}`);
+    });
+    Logger.log(`Обработано ${results.length} продуктов (columnar)`);
+    return results;
+  }
+
   processProduct(result) {
     const article = String(result.article);
     let title = OZON_CONFIG.MESSAGES.NO_DATA;
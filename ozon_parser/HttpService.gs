@@ -103,7 +103,7 @@ class OZON_HttpService {
           "Content-Type": "application/json",
           "ngrok-skip-browser-warning": "true", // Для обхода предупреждения ngrok
         },
-        payload: JSON.stringify({ articles }),
+        payload: JSON.stringify({ articles, format: OZON_CONFIG.RESPONSE_FORMAT }),
         muteHttpExceptions: true,
       };
 
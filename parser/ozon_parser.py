@@ -1,11 +1,29 @@
 import json
 import logging
 import time
+import threading
+import contextvars
 import concurrent.futures
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import List, Optional, Set
 from driver_manager.selenium_manager import SeleniumManager
-from models.schemas import ArticleResult, PriceInfo, SellerInfo
+from driver_manager.standby_pool import standby_pool
+from models.schemas import (
+    ArticleResult, PriceInfo, SellerInfo, ArticleTimings, RequestTimings, TimingEvent, WorkerTimings
+)
 from utils.captcha_solver import OzonCaptchaSolverV3
+from utils.proxy_manager import proxy_manager
+from utils.rate_limiter import rate_limiter
+from utils.session_store import session_store
+from utils.logging_setup import log_context, SAMPLED
+from utils.metrics import (
+    STAGE_SECONDS, ARTICLE_SECONDS, ARTICLES_TOTAL, ARTICLE_RETRIES_TOTAL, CAPTCHA_RECOVERIES_TOTAL,
+    ACTIVE_WORKERS, QUEUE_DEPTH, ARTICLES_IN_FLIGHT, DRIVER_RECYCLES_TOTAL, NETWORK_BYTES_TOTAL,
+    BLOCKED_REQUESTS_TOTAL, PROXY_NETWORK_BYTES_TOTAL, PROXY_BUDGET_USED, ARTICLE_BYTES, BUDGET_SAVER_TOTAL
+)
+from utils.response_cache import composer_cache
+from utils.process_monitor import process_monitor
+from utils.recovery_policy import recovery_policy, SOLVE, REFRESH, ROTATE_PROXY, NEW_DRIVER
 from utils.helpers import (
     build_ozon_api_url, 
     find_web_price_property, 
@@ -20,6 +38,49 @@ from selenium.webdriver.common.by import By
 
 logger = logging.getLogger(__name__)
 
+# Исход артикула для метрик по тексту ошибки ArticleResult
+OUTCOME_BY_ERROR = {
+    "Captcha solving failed": "captcha",
+    "Navigation to product page failed": "blocked",
+    "No JSON response": "no_json",
+    "JSON parsing failed": "parse_failure",
+    "Driver restart failed": "driver_failure",
+}
+
+
+class DriverRestartError(RuntimeError):
+    """Старый драйвер закрыт, новый не поднялся — воркер больше не может разбирать артикулы"""
+
+
+class BatchTimeline:
+    """Тайминги одного запроса для debug_timings: воркеры добавляют свои сводки из своих потоков"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._workers: List[WorkerTimings] = []
+        self._lock = threading.Lock()
+
+    def offset(self, timestamp: Optional[float] = None) -> float:
+        """Секунды от начала запроса"""
+        return round((timestamp or time.time()) - self.started, 3)
+
+    def add_worker(self, timings: WorkerTimings) -> None:
+        with self._lock:
+            self._workers.append(timings)
+
+    def summary(self) -> RequestTimings:
+        with self._lock:
+            workers = sorted(self._workers, key=lambda worker: worker.worker_id)
+        slowest = max(workers, key=lambda worker: worker.total, default=None)
+        return RequestTimings(
+            total=self.offset(),
+            driver_startup=max((worker.driver_startup for worker in workers), default=0.0),
+            queueing=max((worker.first_article for worker in workers if worker.first_article is not None),
+                         default=0.0),
+            slowest_worker=slowest.worker_id if slowest else None,
+            workers=workers
+        )
+
 
 class OzonParser:
     def __init__(self):
@@ -31,20 +92,22 @@ class OzonParser:
     def initialize(self):
         logger.info("Ozon parser initialized successfully")
 
-    def parse_articles(self, articles: List[int]) -> List[ArticleResult]:
+    def parse_articles(self, articles: List[int], fields: Optional[Set[str]] = None,
+                       timeline: Optional[BatchTimeline] = None) -> List[ArticleResult]:
+        """timeline — собрать тайминги по этапам (debug_timings), результаты получат поле timings"""
         total_articles = len(articles)
         logger.info(f"Starting to parse {total_articles} articles with target time {self.TARGET_TIME_SECONDS}s")
         
         if total_articles <= self.MIN_ARTICLES_PER_WORKER:
             # Мало артикулов - используем один воркер
             logger.info("Using single worker for small batch")
-            return self._parse_with_single_worker(articles)
+            return self._parse_with_single_worker(articles, fields, timeline)
         
         # Рассчитываем оптимальное количество воркеров
         worker_groups = self._calculate_optimal_workers(articles)
         logger.info(f"Using {len(worker_groups)} workers for {total_articles} articles")
         
-        return self._parse_with_multiple_workers(worker_groups, articles)
+        return self._parse_with_multiple_workers(worker_groups, articles, fields, timeline)
     
     def _calculate_optimal_workers(self, articles: List[int]) -> List[List[int]]:
         total_articles = len(articles)
@@ -83,22 +146,22 @@ class OzonParser:
         
         return worker_groups
     
-    def _parse_with_single_worker(self, articles: List[int]) -> List[ArticleResult]:
-        worker = OzonWorker()
-        try:
-            worker.initialize()
-            return worker.parse_articles(articles)
-        finally:
-            worker.close()
+    def _parse_with_single_worker(self, articles: List[int], fields: Optional[Set[str]] = None,
+                                  timeline: Optional[BatchTimeline] = None) -> List[ArticleResult]:
+        return self._run_worker(articles, 1, fields, timeline)
     
-    def _parse_with_multiple_workers(self, worker_groups: List[List[int]], original_articles: List[int]) -> List[ArticleResult]:
+    def _parse_with_multiple_workers(self, worker_groups: List[List[int]], original_articles: List[int],
+                                     fields: Optional[Set[str]] = None,
+                                     timeline: Optional[BatchTimeline] = None) -> List[ArticleResult]:
         start_time = time.time()
         
         with concurrent.futures.ThreadPoolExecutor(max_workers=len(worker_groups)) as executor:
             # Запускаем все воркеры параллельно
             futures = []
             for i, group in enumerate(worker_groups):
-                future = executor.submit(self._parse_worker_group, group, i+1)
+                # Потоки пула не наследуют contextvars: переносим request_id в логи воркера
+                context = contextvars.copy_context()
+                future = executor.submit(context.run, self._parse_worker_group, group, i+1, fields, timeline)
                 futures.append(future)
             
             # Собираем результаты по мере готовности
@@ -122,14 +185,35 @@ class OzonParser:
         
         return self._sort_results_by_original_order(all_results, original_articles)
     
-    def _parse_worker_group(self, articles: List[int], worker_id: int) -> List[ArticleResult]:
+    def _parse_worker_group(self, articles: List[int], worker_id: int,
+                            fields: Optional[Set[str]] = None,
+                            timeline: Optional[BatchTimeline] = None) -> List[ArticleResult]:
         logger.info(f"Worker {worker_id} starting with {len(articles)} articles")
-        worker = OzonWorker(worker_id)
+        return self._run_worker(articles, worker_id, fields, timeline)
+
+    def _run_worker(self, articles: List[int], worker_id: int, fields: Optional[Set[str]] = None,
+                    timeline: Optional[BatchTimeline] = None) -> List[ArticleResult]:
+        worker_start = time.time()
+        QUEUE_DEPTH.inc(len(articles))
+        worker = OzonWorker(worker_id, timeline)
         try:
-            worker.initialize()
-            return worker.parse_articles(articles)
+            with log_context(worker_id=worker_id):
+                worker.initialize()
+                return worker.parse_articles(articles, fields)
         finally:
+            QUEUE_DEPTH.dec(len(articles) - worker.articles_started)
             worker.close()
+            if timeline is not None:
+                timeline.add_worker(WorkerTimings(
+                    worker_id=worker_id,
+                    started=timeline.offset(worker_start),
+                    first_article=timeline.offset(worker.first_article_at) if worker.first_article_at else None,
+                    driver_startup=round(worker.driver_startup, 3),
+                    articles=worker.articles_started,
+                    total=round(time.time() - worker_start, 3),
+                    network_bytes=worker.network_bytes,
+                    blocked_requests=worker.blocked_requests
+                ))
     
     def _sort_results_by_original_order(self, results: List[ArticleResult], original_articles: List[int]) -> List[ArticleResult]:
         result_dict = {result.article: result for result in results}
@@ -140,23 +224,94 @@ class OzonParser:
 
 
 class OzonWorker:
-    def __init__(self, worker_id: int = 1):
+    def __init__(self, worker_id: int = 1, timeline: Optional[BatchTimeline] = None):
         self.worker_id = worker_id
+        self.timeline = timeline
         self.selenium_manager = SeleniumManager()
         self.driver = None
+        # Сессия прогрета (куки Ozon получены) и сессия восстановлена из хранилища и ещё не проверена
+        self.session_warm = False
+        self.session_restored = False
+        self.articles_started = 0
+        self.first_article_at: Optional[float] = None
+        self.driver_startup = 0.0
+        # Учёт дерева процессов текущего драйвера и артикулы на нём (для пересоздания)
+        self._process_handle: Optional[int] = None
+        self.driver_articles = 0
+        # Трафик браузеров воркера (все драйверы за время его жизни) и текущего артикула
+        self.network_bytes = 0
+        self.blocked_requests = 0
+        self.article_bytes = 0
+        # Этапы текущего артикула и номер попытки (только при debug_timings)
+        self._events: Optional[List[TimingEvent]] = None
+        self._attempt = 0
     
+    def _record_stage(self, name: str, start: float, duration: float, sleep: Optional[float] = None):
+        STAGE_SECONDS.labels(name).observe(duration)
+        if self._events is not None:
+            self._events.append(TimingEvent(
+                stage=name,
+                attempt=self._attempt + 1,
+                start=self.timeline.offset(start),
+                duration=round(duration, 3),
+                sleep=round(sleep, 3) if sleep else None
+            ))
+
+    @contextmanager
+    def _stage(self, name: str):
+        """Замер этапа: гистограмма ozon_stage_seconds и таймлайн артикула при debug_timings"""
+        start = time.time()
+        slept = self.selenium_manager.sleep_total
+        try:
+            yield
+        finally:
+            self._record_stage(name, start, time.time() - start, self.selenium_manager.sleep_total - slept)
+
+    def _sleep(self, seconds: float):
+        """Намеренная пауза: этап sleep и sleep_total драйвера (пауза внутри объемлющего этапа)"""
+        with self._stage("sleep"):
+            self.selenium_manager._sleep(seconds)
+
     def initialize(self):
         try:
-            self.driver = self.selenium_manager.setup_driver()
+            start = time.time()
+            # Запасной прогретый драйвер — без запуска Chrome и проверок IP
+            standby = standby_pool.lease()
+            if standby is not None:
+                self.selenium_manager = standby.manager
+            with self._stage("setup_driver"):
+                if standby is not None:
+                    self.driver = standby.manager.driver
+                else:
+                    self.driver = self.selenium_manager.setup_driver()
+            self.driver_startup = time.time() - start
+            ACTIVE_WORKERS.inc()
+            self._track_driver()
+            if standby is not None:
+                self.session_warm = standby.session_warm
+                logger.info(f"Worker {self.worker_id} leased standby driver "
+                            f"(session_warm={standby.session_warm})")
+            else:
+                self.start_session()
+            # Трафик запуска (проверки IP) — воркеру и прокси, но не первому артикулу
+            self._account_network()
             logger.info(f"Worker {self.worker_id} initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize worker {self.worker_id}: {e}")
             raise
 
+    def _captcha_corpus_dir(self, save_captcha: Optional[bool] = None) -> Optional[str]:
+        """Папка корпуса капч, если сохранение образцов включено"""
+        if save_captcha is None:
+            save_captcha = settings.SAVE_CAPTCHA_SAMPLES
+        return settings.CAPTCHA_CORPUS_DIR if save_captcha else None
+
     # В ozon_parser.py в методе handle_blocked_page:
-    def handle_blocked_page(self, context: str = "unknown"):
+    def handle_blocked_page(self, context: str = "unknown", save_captcha: Optional[bool] = None):
         """
         Вызывается когда страница, скорее всего, заблокирована (капча / enable JS / антибот).
+        save_captcha — сохранить изображения капчи и сработавшее смещение в корпус
+        (по умолчанию settings.SAVE_CAPTCHA_SAMPLES).
         """
         if not self.driver:
             logger.warning(f"Worker {self.worker_id}: no driver to handle blocked page")
@@ -180,9 +335,11 @@ class OzonWorker:
                     logger.info(f"Worker {self.worker_id}: Attempting to solve slider captcha...")
 
                     # Пытаемся решить капчу
-                    solver = OzonCaptchaSolverV3(self.driver)
-                    time.sleep(2)
-                    if solver.solve():
+                    solver = OzonCaptchaSolverV3(self.driver, corpus_dir=self._captcha_corpus_dir(save_captcha))
+                    self._sleep(2)
+                    with self.selenium_manager.requests_unblocked():
+                        solved = solver.solve()
+                    if solved:
                         logger.info(f"Worker {self.worker_id}: Captcha solved successfully!")
                         return True
                     else:
@@ -217,7 +374,7 @@ class OzonWorker:
             logger.error(f"Worker {self.worker_id}: failed to handle blocked page: {e}")
             return False
 
-    def parse_articles(self, articles: List[int]) -> List[ArticleResult]:
+    def parse_articles(self, articles: List[int], fields: Optional[Set[str]] = None) -> List[ArticleResult]:
         if not self.driver:
             raise RuntimeError(f"Worker {self.worker_id} not initialized")
         
@@ -226,8 +383,54 @@ class OzonWorker:
         
         for i, article in enumerate(articles, 1):
             article_start = time.time()
-            result = self.parse_article_fast(article)
+            if self.first_article_at is None:
+                self.first_article_at = article_start
+            self.articles_started += 1
+            QUEUE_DEPTH.dec()
+            ARTICLES_IN_FLIGHT.inc()
+            self.article_bytes = 0
+            if self.timeline is not None:
+                self._events = []
+            try:
+                with log_context(article=article):
+                    result = self.parse_article_fast(article, fields)
+            except DriverRestartError as e:
+                logger.error(f"Worker {self.worker_id}: {e}, failing {len(articles) - i + 1} remaining articles")
+                results.extend(self._fail_articles(articles[i - 1:]))
+                break
+            finally:
+                ARTICLES_IN_FLIGHT.dec()
+            self._account_network()
+            ARTICLE_BYTES.observe(self.article_bytes)
+            if self._events is not None:
+                result.timings = ArticleTimings(
+                    worker_id=self.worker_id,
+                    started=self.timeline.offset(article_start),
+                    total=round(time.time() - article_start, 3),
+                    attempts=self._attempt + 1,
+                    stages=self._events,
+                    network_bytes=self.article_bytes
+                )
+                self._events = None
             results.append(result)
+            self.driver_articles += 1
+            ARTICLE_SECONDS.observe(time.time() - article_start)
+            ARTICLES_TOTAL.labels("success" if result.success else OUTCOME_BY_ERROR.get(result.error, "error")).inc()
+            
+            recycle_reason = self._recycle_reason()
+            if i < len(articles):
+                # Прокси удалили на ходу: артикул дообработан, драйвер уходит, оставшиеся — на новом прокси
+                if proxy_manager.is_removed(self.selenium_manager.proxy):
+                    logger.info(f"Worker {self.worker_id}: proxy was removed, retiring driver")
+                    if not self._restart_between_articles(articles[i:], results, rotate_proxy=True):
+                        break
+                elif recycle_reason:
+                    # Долгоживущий Chrome разрастается: пересоздаём на том же прокси с сохранённой сессией
+                    logger.info(f"Worker {self.worker_id}: recycling driver ({recycle_reason}) "
+                                f"after {self.driver_articles} articles")
+                    DRIVER_RECYCLES_TOTAL.labels(recycle_reason).inc()
+                    if not self._restart_between_articles(articles[i:], results):
+                        break
             
             article_time = time.time() - article_start
             elapsed_total = time.time() - start_time
@@ -237,113 +440,145 @@ class OzonWorker:
             
             logger.info(f"Worker {self.worker_id}: {i}/{len(articles)} articles, "
                        f"current: {article_time:.1f}s, avg: {avg_time:.1f}s, "
-                       f"ETA: {estimated_remaining:.1f}s")
+                       f"ETA: {estimated_remaining:.1f}s", extra=SAMPLED)
         
         total_time = time.time() - start_time
         logger.info(f"Worker {self.worker_id} completed {len(articles)} articles in {total_time:.1f}s")
         
         return results
 
-    def parse_article_fast(self, article: int) -> ArticleResult:
+    def _restart_between_articles(self, remaining: List[int], results: List[ArticleResult],
+                                  rotate_proxy: bool = False) -> bool:
+        """restart_driver между артикулами; если драйвер не поднялся — оставшиеся артикулы в results неудачными"""
+        try:
+            self.restart_driver(rotate_proxy=rotate_proxy)
+            return True
+        except DriverRestartError as e:
+            logger.error(f"Worker {self.worker_id}: {e}, failing {len(remaining)} remaining articles")
+            results.extend(self._fail_articles(remaining))
+            return False
+
+    def _fail_articles(self, articles: List[int]) -> List[ArticleResult]:
+        """Неудачные результаты для артикулов, которые воркер без драйвера уже не разберёт"""
+        ARTICLES_TOTAL.labels(OUTCOME_BY_ERROR["Driver restart failed"]).inc(len(articles))
+        return [ArticleResult(article=article, success=False, error="Driver restart failed")
+                for article in articles]
+
+    def parse_article_fast(self, article: int, fields: Optional[Set[str]] = None) -> ArticleResult:
         """Быстрый парсинг с улучшенной обработкой капчи"""
+        saver = self.budget_saver_active()
+        if saver:
+            cached = composer_cache.get(article, fields)
+            if cached:
+                BUDGET_SAVER_TOTAL.labels("cache").inc()
+                return cached
+
         for attempt in range(3):  # Увеличиваем до 3 попыток
+            self._attempt = attempt
+            if attempt:
+                ARTICLE_RETRIES_TOTAL.inc()
             try:
                 api_url = build_ozon_api_url(article)
 
-                # 0) Прогрев куков: сначала открываем обычную карточку товара
-                product_url = f"{settings.OZON_BASE_URL}"
-
-                navigation_success = self.selenium_manager.navigate_to_url(product_url)
-
-                if not navigation_success:
-                    # Проверяем, точно ли это капча
-                    time.sleep(2)  # Даем время для загрузки
-
-                    if self.is_captcha_present():
-                        logger.info(f"Captcha detected, attempting to solve...")
-                        if self.solve_captcha():
-                            logger.info("Captcha solved successfully")
-                            # После решения капчи продолжаем
-                            time.sleep(2)
-                            # Пробуем перейти снова
-                            navigation_success = self.selenium_manager.navigate_to_url(product_url)
-                            if not navigation_success:
+                # 0) Прогрев куков: сначала открываем обычную карточку товара.
+                # Восстановленная или уже прогретая сессия прокси прогрева не требует
+                if not self.session_warm:
+                    product_url = f"{settings.OZON_BASE_URL}"
+
+                    with self._stage("warmup_navigation"):
+                        navigation_success = self.selenium_manager.navigate_to_url(product_url)
+
+                    if not navigation_success:
+                        # Проверяем, точно ли это капча
+                        self._sleep(2)  # Даем время для загрузки
+
+                        if self.is_captcha_present():
+                            logger.info(f"Captcha detected, choosing recovery strategy...")
+                            self.report_block(captcha=True)
+                            if self.recover_from_captcha(product_url):
+                                logger.info("Recovered from captcha")
+                            else:
+                                logger.warning("Failed to recover from captcha")
                                 if attempt < 2:
                                     continue
                                 return ArticleResult(article=article, success=False,
-                                                     error="Navigation failed after captcha")
+                                                     error="Captcha solving failed")
                         else:
-                            logger.warning("Failed to solve captcha")
+                            # Не капча, а другая ошибка
+                            self.report_block()
+                            self.handle_blocked_page(context=f"product_{article}_attempt_{attempt + 1}")
                             if attempt < 2:
-                                # Пробуем обновить страницу и повторить
-                                self.driver.refresh()
-                                time.sleep(3)
+                                self._sleep(1)
                                 continue
                             return ArticleResult(article=article, success=False,
-                                                 error="Captcha solving failed")
-                    else:
-                        # Не капча, а другая ошибка
-                        self.handle_blocked_page(context=f"product_{article}_attempt_{attempt + 1}")
-                        if attempt < 2:
-                            time.sleep(1)
-                            continue
-                        return ArticleResult(article=article, success=False,
-                                             error="Navigation to product page failed")
-
-                time.sleep(2)  # даём озону поставить куки/сессию
-
-                # 1) Теперь идём в composer-api
-                navigation_success = self.selenium_manager.navigate_to_url(api_url)
-
-                if not navigation_success:
-                    # Аналогичная обработка для API страницы
-                    time.sleep(2)
-
-                    if self.is_captcha_present():
-                        logger.info(f"Captcha detected on API page, attempting to solve...")
-                        if self.solve_captcha():
-                            logger.info("Captcha solved on API page")
-                            time.sleep(2)
-                            navigation_success = self.selenium_manager.navigate_to_url(api_url)
-                            if not navigation_success:
+                                                 error="Navigation to product page failed")
+
+                    self._sleep(2)  # даём озону поставить куки/сессию
+                    self.mark_session_warm()
+
+                # 1) На исходе бюджета прокси — composer-api через fetch из открытой страницы Ozon
+                json_content = None
+                if saver and self.selenium_manager.on_ozon_page():
+                    with self._stage("composer_fetch"):
+                        json_content = self.selenium_manager.fetch_in_page(api_url)
+                    if json_content:
+                        BUDGET_SAVER_TOTAL.labels("fetch").inc()
+
+                if json_content is None:
+                    # Иначе идём в composer-api навигацией
+                    with self._stage("composer_navigation"):
+                        navigation_success = self.selenium_manager.navigate_to_url(api_url)
+
+                    if not navigation_success:
+                        # Аналогичная обработка для API страницы
+                        self._sleep(2)
+
+                        if self.is_captcha_present():
+                            logger.info(f"Captcha detected on API page, choosing recovery strategy...")
+                            self.report_block(captcha=True)
+                            if self.recover_from_captcha(api_url):
+                                logger.info("Recovered from captcha on API page")
+                            else:
+                                logger.warning("Failed to recover from captcha on API page")
                                 if attempt < 2:
                                     continue
-                                return ArticleResult(article=article, success=False,
-                                                     error="Navigation to API failed after captcha")
                         else:
-                            logger.warning("Failed to solve captcha on API page")
+                            self.report_block()
+                            self.handle_blocked_page(context=f"api_{article}_attempt_{attempt + 1}")
                             if attempt < 2:
-                                self.driver.refresh()
-                                time.sleep(3)
                                 continue
-                    else:
-                        self.handle_blocked_page(context=f"api_{article}_attempt_{attempt + 1}")
-                        if attempt < 2:
-                            continue
 
-                # 2) Ждем JSON
-                json_content = self.selenium_manager.wait_for_json_response(timeout=30)
+                    # 2) Ждем JSON
+                    with self._stage("wait_json"):
+                        json_content = self.selenium_manager.wait_for_json_response(timeout=30)
 
-                if not json_content:
-                    if attempt < 2:
-                        continue
-                    return ArticleResult(article=article, success=False, error="No JSON response")
+                    if not json_content:
+                        if attempt < 2:
+                            continue
+                        return ArticleResult(article=article, success=False, error="No JSON response")
 
                 # Парсинг данных
-                result = self.extract_price_info(json_content, article)
+                with self._stage("extract_price_info"):
+                    result = self.extract_price_info(json_content, article, fields)
 
                 if result and result.success:
+                    proxy_manager.report_success(self.selenium_manager.proxy)
+                    self.session_restored = False
+                    if fields is None:
+                        composer_cache.put(result)
                     return result
                 elif attempt < 2:
                     continue
                 else:
                     return ArticleResult(article=article, success=False, error="JSON parsing failed")
 
+            except DriverRestartError:
+                raise
             except Exception as e:
                 self.handle_blocked_page(context=f"exception_article_{article}_attempt_{attempt + 1}")
                 logger.error(f"Attempt {attempt + 1} failed: {e}")
                 if attempt < 2:
-                    time.sleep(1)
+                    self._sleep(1)
                     continue
 
         return ArticleResult(article=article, success=False, error="Max retries exceeded")
@@ -363,17 +598,161 @@ class OzonWorker:
         except:
             return False
 
+    def start_session(self):
+        """Восстанавливает сохранённую сессию прокси нового драйвера — тогда прогрев не нужен"""
+        restored = settings.SESSION_AFFINITY and self.selenium_manager.restore_session()
+        self.session_warm = self.session_restored = restored
+
+    def mark_session_warm(self):
+        """Прогрев прошёл: сохраняем сессию для следующих драйверов на этом прокси"""
+        if not settings.SESSION_AFFINITY or self.session_warm:
+            return
+        self.selenium_manager.save_session()
+        self.session_warm = True
+
+    def report_block(self, captcha: bool = False):
+        """Блокировка или капча: учитываем в здоровье прокси и заново прогреваем сессию"""
+        proxy_manager.report_block(self.selenium_manager.proxy, captcha=captcha)
+        self.session_warm = False
+        if self.session_restored:
+            # Восстановленная сессия сразу упёрлась в блокировку — больше её не используем
+            session_store.discard(self.selenium_manager.proxy)
+            self.session_restored = False
+
+    def _recovery_strategies(self) -> List[str]:
+        if not settings.RECOVERY_POLICY_ENABLED:
+            return [SOLVE]
+
+        strategies = [SOLVE, REFRESH, NEW_DRIVER]
+        # Ротация имеет смысл, только если есть другой прокси
+        if len(proxy_manager.get_proxies()) > 1:
+            strategies.append(ROTATE_PROXY)
+        return strategies
+
+    def _track_driver(self):
+        """Начинает учёт процессов нового драйвера"""
+        process_monitor.unregister(self._process_handle)
+        self._process_handle = process_monitor.register(self.worker_id, self.selenium_manager.process_pids())
+        self.driver_articles = 0
+
+    def _account_network(self):
+        """Переносит трафик браузера с прошлого замера в счётчики воркера"""
+        received, blocked = self.selenium_manager.collect_network_stats()
+        self.network_bytes += received
+        self.blocked_requests += blocked
+        self.article_bytes += received
+        NETWORK_BYTES_TOTAL.labels(str(self.worker_id)).inc(received)
+        BLOCKED_REQUESTS_TOTAL.labels(str(self.worker_id)).inc(blocked)
+
+        proxy = self.selenium_manager.proxy
+        label = proxy.key if proxy else "direct"
+        PROXY_NETWORK_BYTES_TOTAL.labels(label).inc(received)
+        proxy_manager.report_bytes(proxy, received)
+        used = proxy_manager.budget_used(proxy)
+        if used is not None:
+            PROXY_BUDGET_USED.labels(label).set(used)
+
+    def budget_saver_active(self) -> bool:
+        """Дневной бюджет трафика прокси почти исчерпан: берём кэш и fetch в странице вместо навигации"""
+        used = proxy_manager.budget_used(self.selenium_manager.proxy)
+        return used is not None and used >= settings.BUDGET_SAVER_THRESHOLD
+
+    def _recycle_reason(self) -> Optional[str]:
+        """Причина пересоздать драйвер: число артикулов на нём или память его дерева процессов"""
+        if settings.DRIVER_MAX_ARTICLES and self.driver_articles >= settings.DRIVER_MAX_ARTICLES:
+            return "articles"
+        tree = process_monitor.sample(self._process_handle)
+        if tree is not None and settings.DRIVER_MAX_RSS_MB and tree.rss > settings.DRIVER_MAX_RSS_MB * 1024 * 1024:
+            return "memory"
+        return None
+
+    def restart_driver(self, rotate_proxy: bool = False):
+        """
+        Закрывает браузер и поднимает новый: на другом прокси или на том же подключении.
+        Если новый не поднялся — DriverRestartError, воркер остаётся без драйвера.
+        """
+        current_proxy = self.selenium_manager.proxy
+        self._account_network()
+        process_monitor.unregister(self._process_handle)
+        self._process_handle = None
+        self.selenium_manager.close()
+        self.driver = None
+
+        try:
+            with self._stage("setup_driver"):
+                if rotate_proxy:
+                    self.driver = self.selenium_manager.setup_driver(exclude_proxy=current_proxy)
+                else:
+                    self.driver = self.selenium_manager.setup_driver(proxy=current_proxy, keep_connection=True)
+        except Exception as e:
+            # Браузера у воркера больше нет: close() не увидит драйвер
+            ACTIVE_WORKERS.dec()
+            self.selenium_manager.close()
+            raise DriverRestartError(f"driver restart failed: {e}") from e
+        self._track_driver()
+        self.start_session()
+        logger.info(f"Worker {self.worker_id}: driver restarted (rotate_proxy={rotate_proxy})")
+
+    def recover_from_captcha(self, url: str) -> bool:
+        """
+        Выходит из капчи самой дешёвой по ожидаемому времени стратегией
+        (решить, обновить страницу, сменить прокси, пересоздать драйвер)
+        и записывает исход в recovery_policy. True — страница url открыта без блокировки.
+        """
+        strategy = recovery_policy.choose(self._recovery_strategies())
+        logger.info(f"Worker {self.worker_id}: recovering from captcha via {strategy}")
+
+        start_time = time.time()
+        success = False
+        restart_error = None
+        try:
+            if strategy == SOLVE:
+                if self.solve_captcha():
+                    self._sleep(2)
+                    success = self.selenium_manager.navigate_to_url(url)
+            elif strategy == REFRESH:
+                rate_limiter.acquire(self.selenium_manager.proxy)
+                self.driver.refresh()
+                self._sleep(3)
+                success = not self.selenium_manager.is_blocked()
+            else:
+                self.restart_driver(rotate_proxy=strategy == ROTATE_PROXY)
+                success = self.selenium_manager.navigate_to_url(url)
+        except DriverRestartError as e:
+            logger.error(f"Worker {self.worker_id}: recovery via {strategy} failed: {e}")
+            restart_error = e
+        except Exception as e:
+            logger.error(f"Worker {self.worker_id}: recovery via {strategy} failed: {e}")
+
+        duration = time.time() - start_time
+        recovery_policy.record(strategy, duration, success)
+        self._record_stage("captcha_recovery", start_time, duration)
+        CAPTCHA_RECOVERIES_TOTAL.labels(strategy, "success" if success else "failure").inc()
+        if restart_error is not None:
+            raise restart_error
+        if success:
+            # Куки после решённой капчи — самые ценные для следующих драйверов на этом прокси
+            self.session_warm = False
+            self.mark_session_warm()
+        return success
+
     def solve_captcha(self):
         """Пытается решить капчу"""
         try:
             from utils.captcha_solver import OzonCaptchaSolverV3
-            solver = OzonCaptchaSolverV3(self.driver)
-            return solver.solve()
+            solver = OzonCaptchaSolverV3(self.driver, corpus_dir=self._captcha_corpus_dir())
+            with self.selenium_manager.requests_unblocked():
+                return solver.solve()
         except Exception as e:
             logger.error(f"Error solving captcha: {e}")
             return False
     
-    def extract_price_info(self, json_content: str, article: int) -> Optional[ArticleResult]:
+    def extract_price_info(self, json_content: str, article: int,
+                           fields: Optional[Set[str]] = None) -> Optional[ArticleResult]:
+        """
+        Извлекает данные товара из ответа composer-api.
+        fields ограничивает набор полей: None — все поля.
+        """
         try:
             if not is_valid_json_response(json_content):
                 return None
@@ -398,25 +777,29 @@ class OzonWorker:
                 
                 from utils.helpers import extract_price_from_string
                 
-                result = ArticleResult(
-                    article=article,
-                    success=True,
-                    isAvailable=is_available,
-                    price_info=PriceInfo(
+                result = ArticleResult(article=article, success=True)
+                
+                if fields is None or 'isAvailable' in fields:
+                    result.isAvailable = is_available
+                
+                if fields is None or 'price_info' in fields:
+                    result.price_info = PriceInfo(
                         cardPrice=extract_price_from_string(card_price),
                         price=extract_price_from_string(price),
                         originalPrice=extract_price_from_string(original_price)
                     )
-                )
                 
-                # Быстрое получение дополнительных данных
-                title = find_product_title(widget_states)
-                if title:
-                    result.title = title
+                # Заголовок и продавец требуют отдельного JSON-декодирования
+                # виджетов — пропускаем, если клиент их не запросил
+                if fields is None or 'title' in fields:
+                    title = find_product_title(widget_states)
+                    if title:
+                        result.title = title
                 
-                seller_name = find_seller_name(widget_states)
-                if seller_name:
-                    result.seller = SellerInfo(name=seller_name)
+                if fields is None or 'seller' in fields:
+                    seller_name = find_seller_name(widget_states)
+                    if seller_name:
+                        result.seller = SellerInfo(name=seller_name)
                 
                 return result
                 
@@ -427,6 +810,12 @@ class OzonWorker:
             return None
     
     def close(self):
+        process_monitor.unregister(self._process_handle)
+        self._process_handle = None
+        if self.driver:
+            self._account_network()
+            ACTIVE_WORKERS.dec()
+            self.driver = None
         if self.selenium_manager:
             self.selenium_manager.close()
         logger.info("Worker closed successfully")
\ No newline at end of file
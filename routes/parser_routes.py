@@ -1,13 +1,24 @@
 import logging
 import time
-from fastapi import APIRouter, HTTPException, status
-from models.schemas import ArticlesRequest, ParseResponse, ArticleResult
-from parser.ozon_parser import OzonParser
-from typing import List
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse
+from starlette.concurrency import run_in_threadpool
+from models.schemas import ArticlesRequest, ParseResponse, ArticleResult, ColumnarParseResponse, COLUMNAR_FIELDS, \
+    ProxyAddRequest
+from parser.ozon_parser import OzonParser, BatchTimeline
+from typing import Dict, List, Optional, Union
+from utils.responses import negotiated_response, MSGPACK_MEDIA_TYPES
+from utils.proxy_manager import proxy_manager, parse_proxy_line, mask_proxy_key, proxy_id
+from utils.rate_limiter import rate_limiter
+from utils.process_monitor import process_monitor
+from config.settings import settings
+from driver_manager.standby_pool import standby_pool
 
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+# ORJSONResponse по умолчанию — быстрая сериализация массовых ответов
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # Global parser instance (будет заменено на pool в будущем)
 parser_instance = None
@@ -24,10 +35,15 @@ def get_parser():
     return parser_instance
 
 
-@router.post("/get_price", response_model=ParseResponse)
-async def get_price(request: ArticlesRequest):
+@router.post(
+    "/get_price",
+    response_model=Union[ParseResponse, ColumnarParseResponse],
+    responses={200: {"content": {media_type: {} for media_type in MSGPACK_MEDIA_TYPES}}}
+)
+async def get_price(request: ArticlesRequest, raw_request: Request):
     """
-    Parse prices for given articles
+    Parse prices for given articles.
+    Send `Accept: application/msgpack` to receive the same schema as MessagePack
     """
     try:
         start_time = time.time()
@@ -36,8 +52,11 @@ async def get_price(request: ArticlesRequest):
         # Get parser instance
         parser = get_parser()
 
-        # Parse articles
-        results = parser.parse_articles(request.articles)
+        # Parse articles: разбор блокирующий — в пуле потоков, чтобы event loop обслуживал
+        # параллельные запросы, /metrics и /health во время батча
+        timeline = BatchTimeline() if request.debug_timings else None
+        results = await run_in_threadpool(parser.parse_articles, request.articles,
+                                          request.requested_fields(), timeline)
 
         # Calculate timing
         end_time = time.time()
@@ -56,12 +75,31 @@ async def get_price(request: ArticlesRequest):
             total_articles=len(request.articles),
             parsed_articles=len(successful_results),
             results=results,
-            errors=errors
+            errors=errors,
+            timings=timeline.summary() if timeline else None
         )
         
         logger.info(f"Parsing completed in {total_time:.2f}s. Success: {len(successful_results)}, Failed: {len(failed_results)}. Average: {avg_time_per_article:.2f}s per article")
         
-        return response
+        # Отдаём готовый ответ напрямую: model_dump + orjson вместо повторной
+        # валидации и jsonable_encoder. При проекции убираем незапрошенные поля
+        # целиком, а не отдаём их как null
+        excluded = request.excluded_fields()
+        if not request.debug_timings:
+            excluded.add('timings')
+        
+        if request.format == 'columnar':
+            columnar = ColumnarParseResponse.from_parse_response(response)
+            excluded_columns = {column for field in excluded for column in COLUMNAR_FIELDS.get(field, (field,))}
+            exclude = {'columns': excluded_columns} if excluded_columns else {}
+            if not request.debug_timings:
+                exclude['timings'] = True
+            return negotiated_response(raw_request, columnar.model_dump(exclude=exclude or None))
+        
+        exclude = {'results': {'__all__': excluded}} if excluded else {}
+        if not request.debug_timings:
+            exclude['timings'] = True
+        return negotiated_response(raw_request, response.model_dump(exclude=exclude or None))
         
     except Exception as e:
         logger.error(f"Error in get_price endpoint: {e}")
@@ -72,11 +110,106 @@ async def get_price(request: ArticlesRequest):
 
 
 @router.get("/health")
-async def health_check():
+def health_check():
+    """
+    Health check endpoint with the last memory/CPU sample of each worker's Chrome process tree
+    (worker_id 0 — standby drivers) and the number of standby drivers ready
+    """
+    return {
+        "status": "ok",
+        "message": "Ozon parser API is running",
+        "resource_accounting": process_monitor.enabled,
+        "standby_drivers": len(standby_pool),
+        "workers": process_monitor.snapshot()
+    }
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Изменение прокси только с X-Admin-Token = settings.ADMIN_TOKEN; без ADMIN_TOKEN — выключено"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Proxy management is disabled (ADMIN_TOKEN is not set)")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token")
+
+
+def _masked(by_key: Dict) -> Dict:
+    return {mask_proxy_key(key): value for key, value in by_key.items()}
+
+
+def _resolve_proxy_key(ref: str) -> str:
+    """Ключ прокси по id, маскированному или полному ключу из пути; 404 — нет, 409 — неоднозначно"""
+    keys = proxy_manager.find_keys(ref)
+    if not keys:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Proxy {mask_proxy_key(ref)} not found")
+    if len(keys) > 1:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail=f"{ref} matches {len(keys)} proxies, use the id from GET /proxies")
+    return keys[0]
+
+
+@router.get("/proxies")
+async def proxies_status():
+    """
+    Proxy health scores, rate limiter buckets (time callers waited per proxy) and today's traffic vs budget.
+    Proxy logins are masked in the keys; `ids` maps the id to pass to the drain/delete routes to the masked key
+    """
+    states = proxy_manager.proxy_states()
+    return {
+        # id → маскированный ключ: у разных логинов маскированные ключи могут совпасть
+        "ids": {proxy_id(key): mask_proxy_key(key) for key, state in states.items() if state != "removed"},
+        "states": _masked(states),
+        "health": _masked(proxy_manager.health_snapshot()),
+        "rate_limits": _masked(rate_limiter.snapshot()),
+        "bandwidth": _masked(proxy_manager.bandwidth_snapshot())
+    }
+
+
+@router.post("/proxies", dependencies=[Depends(require_admin_token)])
+async def add_proxy(request: ProxyAddRequest):
+    """
+    Add a proxy to rotation at runtime (or bring a draining one back)
+    """
+    proxy = parse_proxy_line(request.proxy)
+    if proxy is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Expected host:port:login:password[:rate_per_minute[:daily_budget_mb]]"
+        )
+    added = proxy_manager.add_proxy(proxy)
+    return {"status": "added" if added else "updated", "key": mask_proxy_key(proxy.key), "id": proxy_id(proxy.key)}
+
+
+@router.post("/proxies/reload", dependencies=[Depends(require_admin_token)])
+async def reload_proxies():
+    """
+    Re-read the proxy file now instead of waiting for the file watcher
+    """
+    return {"status": "success", **proxy_manager.reload()}
+
+
+@router.post("/proxies/{proxy_ref}/drain", dependencies=[Depends(require_admin_token)])
+async def drain_proxy(proxy_ref: str):
+    """
+    Stop assigning the proxy to new drivers; running drivers keep it.
+    `proxy_ref` is the id from GET /proxies, the masked key or the full key
+    """
+    key = _resolve_proxy_key(proxy_ref)
+    if not proxy_manager.drain_proxy(key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Proxy {mask_proxy_key(key)} not found")
+    return {"status": "draining", "key": mask_proxy_key(key), "id": proxy_id(key)}
+
+
+@router.delete("/proxies/{proxy_ref}", dependencies=[Depends(require_admin_token)])
+async def remove_proxy(proxy_ref: str):
     """
-    Health check endpoint
+    Remove the proxy; drivers using it finish the current article and retire.
+    `proxy_ref` is the id from GET /proxies, the masked key or the full key
     """
-    return {"status": "ok", "message": "Ozon parser API is running"}
+    key = _resolve_proxy_key(proxy_ref)
+    if not proxy_manager.remove_proxy(key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Proxy {mask_proxy_key(key)} not found")
+    return {"status": "removed", "key": mask_proxy_key(key), "id": proxy_id(key)}
 
 
 @router.post("/restart_parser")
@@ -5,12 +5,55 @@
 1774818716, 1649767704, 2433082108, 1372069683
 """
 
+import argparse
+import asyncio
+import random
 import requests
 import json
 import time
-import sys
+from collections import Counter
 from typing import List, Dict, Any
 
+import aiohttp
+
+# Реальные тестовые артикулы
+TEST_ARTICLES = [
+    2360879218, 859220077, 2430448285, 2392842054, 
+    1774818716, 1649767704, 2433082108, 1372069683,
+    2360879218,859220077,2430448285,2392842054,1774818716,1649767704,2433082108,1372069683,1769433039,1837510918,2384249751,2384245580,2328688150,2328688150,2246018851,2274804444,2229057548,1707200180,1563574023,1922781846,550798603,1640239319,2246017617,2042778498,1972531799,1891423572,1590382207,1644248201,1922781204,1044578885,1761947652,1871396205,2403251730,2403251749,1972531451,1998259730,2293789309,1787544241,1691820698
+]
+
+# Пауза клиента нагрузочного теста после ошибки соединения (сервер недоступен)
+CONNECTION_ERROR_BACKOFF = 1.0
+# Пауза после ответа не 2xx (429, 5xx), если сервер не прислал Retry-After
+HTTP_ERROR_BACKOFF = 1.0
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Перцентиль по ближайшему рангу"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def build_article_pool(pool: str, size: int) -> List[int]:
+    """
+    Пул артикулов для нагрузочного теста
+    
+    Args:
+        pool: real — реальные тестовые артикулы, synthetic — последовательные номера
+              (для mock Ozon), иначе путь к файлу с артикулами по одному в строке
+        size: Размер синтетического пула
+    """
+    if pool == "real":
+        return list(dict.fromkeys(TEST_ARTICLES))
+    if pool == "synthetic":
+        return list(range(1_000_000, 1_000_000 + size))
+    with open(pool, "r", encoding="utf-8") as f:
+        return [int(line) for line in f if line.strip() and not line.startswith("#")]
+
 
 class OzonAPITester:
     def __init__(self, base_url: str):
@@ -221,11 +264,7 @@ class OzonAPITester:
         print("="*60)
         
         # Реальные тестовые артикулы
-        test_articles = [
-            2360879218, 859220077, 2430448285, 2392842054, 
-            1774818716, 1649767704, 2433082108, 1372069683,
-            2360879218,859220077,2430448285,2392842054,1774818716,1649767704,2433082108,1372069683,1769433039,1837510918,2384249751,2384245580,2328688150,2328688150,2246018851,2274804444,2229057548,1707200180,1563574023,1922781846,550798603,1640239319,2246017617,2042778498,1972531799,1891423572,1590382207,1644248201,1922781204,1044578885,1761947652,1871396205,2403251730,2403251749,1972531451,1998259730,2293789309,1787544241,1691820698
-        ]
+        test_articles = TEST_ARTICLES
         
         print(f"📦 Тестируем {len(test_articles)} артикулов:")
         for i, article in enumerate(test_articles, 1):
@@ -314,23 +353,166 @@ class OzonAPITester:
             print(f"🔍 Ошибка: {multiple_result.get('error', 'Unknown')}")
         
         return not multiple_result.get('error', True)
+    
+    async def _load_client(self, session: aiohttp.ClientSession, pool: List[int], sizes: List[int],
+                           deadline: float, timeout: float, stats: Dict[str, Any]):
+        """
+        Один клиент нагрузочного теста: шлёт запросы подряд до дедлайна
+        """
+        while time.perf_counter() < deadline:
+            size = min(random.choice(sizes), len(pool))
+            payload = {"articles": random.sample(pool, size)}
+            
+            start_time = time.perf_counter()
+            try:
+                async with session.post(f"{self.base_url}/api/v1/get_price", json=payload,
+                                        timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    body = await response.read()
+                    latency = time.perf_counter() - start_time
+                    
+                    if not 200 <= response.status < 300:
+                        stats["http_errors"][f"HTTP {response.status}"] += 1
+                        # Перегруженный сервер (429, 503) не добиваем немедленными повторами
+                        backoff = HTTP_ERROR_BACKOFF
+                        try:
+                            backoff = float(response.headers.get("Retry-After", backoff))
+                        except ValueError:
+                            pass
+                        await asyncio.sleep(max(0.0, min(backoff, deadline - time.perf_counter())))
+                        continue
+                    
+                    data = json.loads(body)
+            except asyncio.TimeoutError:
+                stats["errors"]["Timeout"] += 1
+                continue
+            except aiohttp.ClientError as e:
+                stats["errors"][type(e).__name__] += 1
+                # Без паузы клиент крутится вхолостую и набирает тысячи одинаковых ошибок
+                await asyncio.sleep(max(0.0, min(CONNECTION_ERROR_BACKOFF, deadline - time.perf_counter())))
+                continue
+            except ValueError:
+                # 200 со страницей ошибки прокси/ngrok вместо JSON
+                stats["errors"]["Invalid JSON"] += 1
+                continue
+            
+            stats["latencies"].append(latency)
+            stats["articles"] += size
+            for result in data.get("results", []):
+                if result.get("success"):
+                    stats["parsed"] += 1
+                else:
+                    stats["article_errors"][result.get("error") or "Unknown"] += 1
+    
+    async def run_load_test(self, clients: int, sizes: List[int], duration: float,
+                            pool: List[int], timeout: float = 300) -> Dict[str, Any]:
+        """
+        Нагрузочный тест: clients конкурентных клиентов в течение duration секунд
+        
+        Args:
+            clients: Число одновременных клиентов
+            sizes: Размеры запросов (число артикулов), выбираются случайно
+            duration: Длительность теста в секундах; начатые запросы дожидаются
+            pool: Пул артикулов, из которого набираются запросы
+            timeout: Таймаут одного запроса
+            
+        Returns:
+            Сводка: пропускная способность, перцентили задержки, разбивка ошибок
+        """
+        print(f"🚀 Нагрузочный тест: {clients} клиентов, размеры запросов {sizes}, "
+              f"{duration:.0f} сек, пул {len(pool)} артикулов")
+        
+        stats = {"latencies": [], "articles": 0, "parsed": 0,
+                 "errors": Counter(), "http_errors": Counter(), "article_errors": Counter()}
+        connector = aiohttp.TCPConnector(limit=clients)
+        
+        start_time = time.perf_counter()
+        async with aiohttp.ClientSession(connector=connector,
+                                         headers={'User-Agent': 'OzonAPITester/1.0'}) as session:
+            await asyncio.gather(*(
+                self._load_client(session, pool, sizes, start_time + duration, timeout, stats)
+                for _ in range(clients)
+            ))
+        elapsed = time.perf_counter() - start_time
+        
+        latencies = stats["latencies"]
+        requests_total = len(latencies) + sum(stats["errors"].values()) + sum(stats["http_errors"].values())
+        report = {
+            "clients": clients,
+            "elapsed": elapsed,
+            "requests": requests_total,
+            "successful_requests": len(latencies),
+            "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+            "articles_per_second": stats["articles"] / elapsed if elapsed else 0.0,
+            "parsed_articles": stats["parsed"],
+            "articles": stats["articles"],
+            "latency": {f"p{p}": percentile(latencies, p) for p in (50, 90, 95, 99)},
+            "errors": dict(stats["errors"]),
+            "http_errors": dict(stats["http_errors"]),
+            "article_errors": dict(stats["article_errors"]),
+        }
+        report["latency"]["max"] = max(latencies, default=0.0)
+        
+        self.print_load_report(report)
+        return report
+    
+    def print_load_report(self, report: Dict[str, Any]):
+        """
+        Печать сводки нагрузочного теста
+        """
+        print("\n" + "="*50)
+        print("📊 РЕЗУЛЬТАТЫ НАГРУЗОЧНОГО ТЕСТА")
+        print("="*50)
+        print(f"⏱️  Длительность: {report['elapsed']:.1f} сек, клиентов: {report['clients']}")
+        print(f"📨 Запросов: {report['successful_requests']}/{report['requests']} успешных")
+        print(f"🚀 Пропускная способность: {report['requests_per_second']:.2f} запр/сек, "
+              f"{report['articles_per_second']:.2f} арт/сек")
+        print(f"✅ Распарсено артикулов: {report['parsed_articles']}/{report['articles']}")
+        
+        latency = report["latency"]
+        print(f"📈 Задержка, сек: p50 {latency['p50']:.2f}  p90 {latency['p90']:.2f}  "
+              f"p95 {latency['p95']:.2f}  p99 {latency['p99']:.2f}  max {latency['max']:.2f}")
+        
+        if report["errors"]:
+            print("❌ Ошибки запросов:")
+            for error, count in sorted(report["errors"].items(), key=lambda item: -item[1]):
+                print(f"  • {error}: {count}")
+        if report["http_errors"]:
+            print("🚦 Ответы не 2xx (клиент делал паузу):")
+            for error, count in sorted(report["http_errors"].items(), key=lambda item: -item[1]):
+                print(f"  • {error}: {count}")
+        if report["article_errors"]:
+            print("⚠️  Ошибки артикулов:")
+            for error, count in sorted(report["article_errors"].items(), key=lambda item: -item[1]):
+                print(f"  • {error}: {count}")
 
 
 def main():
     """
     Главная функция для запуска тестов
     """
-    # Проверяем аргументы командной строки
-    if len(sys.argv) < 2:
-        print("❌ Использование: python test_api.py <ngrok_url>")
-        print("📝 Пример: python test_api.py https://abc123.ngrok.io")
-        sys.exit(1)
-    
-    base_url = sys.argv[1]
+    parser = argparse.ArgumentParser(
+        description="Проверка API парсера Ozon",
+        epilog="Пример: python test_api.py https://abc123.ngrok.io --load --clients 8 --sizes 1 10 50"
+    )
+    parser.add_argument("base_url", help="Базовый URL API (например, https://abc123.ngrok.io)")
+    parser.add_argument("--load", action="store_true", help="Нагрузочный тест вместо полного прогона")
+    parser.add_argument("--clients", type=int, default=4, help="Число одновременных клиентов")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10],
+                        help="Размеры запросов в артикулах, выбираются случайно")
+    parser.add_argument("--duration", type=float, default=60, help="Длительность теста в секундах")
+    parser.add_argument("--pool", default="real",
+                        help="Пул артикулов: real, synthetic (для mock Ozon) или путь к файлу")
+    parser.add_argument("--pool-size", type=int, default=1000, help="Размер синтетического пула")
+    parser.add_argument("--timeout", type=float, default=300, help="Таймаут одного запроса в секундах")
+    args = parser.parse_args()
     
     # Создаем тестер и запускаем тесты
-    tester = OzonAPITester(base_url)
-    tester.run_full_test()
+    tester = OzonAPITester(args.base_url)
+    if args.load:
+        pool = build_article_pool(args.pool, args.pool_size)
+        asyncio.run(tester.run_load_test(args.clients, args.sizes, args.duration, pool, args.timeout))
+    else:
+        tester.run_full_test()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+import time
+
+import parser.ozon_parser as ozon_parser
+from models.schemas import ArticleResult
+from parser.ozon_parser import BatchTimeline, OzonParser, OzonWorker
+
+DRIVER_STARTUP = 0.2
+
+
+class SlowStartWorker(OzonWorker):
+    """Воркер без браузера: «запуск драйвера» занимает DRIVER_STARTUP секунд"""
+
+    def initialize(self):
+        time.sleep(DRIVER_STARTUP)
+        self.driver = object()
+        self.driver_startup = DRIVER_STARTUP
+        return True
+
+    def parse_article_fast(self, article, fields=None):
+        return ArticleResult(article=article, success=True)
+
+    def _account_network(self):
+        pass
+
+    def close(self):
+        self.driver = None
+
+
+def test_queueing_is_wait_until_first_article(monkeypatch):
+    monkeypatch.setattr(ozon_parser, "OzonWorker", SlowStartWorker)
+    timeline = BatchTimeline()
+
+    results = OzonParser()._run_worker([1, 2], 1, timeline=timeline)
+    summary = timeline.summary()
+
+    assert [result.success for result in results] == [True, True]
+    assert summary.workers[0].started < DRIVER_STARTUP
+    assert summary.workers[0].first_article >= DRIVER_STARTUP
+    assert summary.queueing == summary.workers[0].first_article
+
+
+def test_worker_without_articles_does_not_count_as_queueing():
+    timeline = BatchTimeline()
+    timeline.add_worker(ozon_parser.WorkerTimings(worker_id=1, started=0.0, first_article=None,
+                                                  driver_startup=5.0, articles=0, total=5.0))
+
+    assert timeline.summary().queueing == 0.0
@@ -0,0 +1,85 @@
+from config.settings import settings
+from utils.proxy_manager import ProxyInfo, ProxyManager, mask_proxy_key, proxy_id
+
+
+def make_manager(*proxies):
+    manager = ProxyManager("/nonexistent/proxies.txt", enabled=True)
+    for proxy in proxies:
+        manager.add_proxy(proxy)
+    return manager
+
+
+def proxy(login="user"):
+    return ProxyInfo(host="10.0.0.1", port="8080", login=login, password="secret")
+
+
+def health(manager, item):
+    return manager.health_snapshot()[item.key]
+
+
+def test_proxy_blocked_on_every_request_is_quarantined():
+    item = proxy()
+    manager = make_manager(item)
+
+    for _ in range(settings.PROXY_MAX_CONSECUTIVE_FAILURES):
+        manager.report_block(item, captcha=True)
+
+    assert health(manager, item)["quarantined"]
+    assert health(manager, item)["consecutive_blocks"] == settings.PROXY_MAX_CONSECUTIVE_FAILURES
+
+
+def test_block_does_not_lift_quarantine():
+    item = proxy()
+    manager = make_manager(item)
+
+    for _ in range(settings.PROXY_MAX_CONSECUTIVE_FAILURES):
+        manager.report_failure(item)
+    manager.report_block(item)
+
+    assert health(manager, item)["quarantined"]
+
+
+def test_probe_success_keeps_block_quarantine_and_ozon_success_lifts_it():
+    item = proxy()
+    manager = make_manager(item)
+    for _ in range(settings.PROXY_MAX_CONSECUTIVE_FAILURES):
+        manager.report_block(item)
+
+    manager.report_success(item, latency=0.1, probe=True)
+    assert health(manager, item)["quarantined"]
+
+    manager.report_success(item)
+    assert not health(manager, item)["quarantined"]
+    assert health(manager, item)["consecutive_blocks"] == 0
+
+
+def test_quarantine_expires_after_cooldown(monkeypatch):
+    item = proxy()
+    manager = make_manager(item)
+    for _ in range(settings.PROXY_MAX_CONSECUTIVE_FAILURES):
+        manager.report_block(item)
+
+    monkeypatch.setattr(settings, "PROXY_QUARANTINE_COOLDOWN", 0)
+    assert not health(manager, item)["quarantined"]
+
+
+def test_all_quarantined_falls_back_to_least_failing_proxy():
+    good, bad = proxy("good"), proxy("bad")
+    manager = make_manager(good, bad)
+    for _ in range(settings.PROXY_MAX_CONSECUTIVE_FAILURES):
+        manager.report_block(good)
+    for _ in range(settings.PROXY_MAX_CONSECUTIVE_FAILURES + 2):
+        manager.report_failure(bad)
+
+    assert manager.get_random_proxy() is good
+
+
+def test_find_keys_by_id_or_masked_key():
+    first, second = proxy("login_a"), proxy("login_b")
+    manager = make_manager(first, second)
+
+    assert manager.find_keys(proxy_id(first.key)) == [first.key]
+    assert manager.find_keys(first.key) == [first.key]
+    # Оба логина маскируются одинаково — выбрать по маскированному ключу нельзя
+    assert sorted(manager.find_keys(mask_proxy_key(first.key))) == sorted([first.key, second.key])
+    assert manager.find_keys("unknown") == []
@@ -0,0 +1,36 @@
+from models.schemas import ArticleResult, PriceInfo
+from utils.response_cache import ResponseCache
+
+
+def live_result(article=1):
+    return ArticleResult(article=article, success=True, isAvailable=True, title="Товар",
+                         price_info=PriceInfo(cardPrice=100, price=120, originalPrice=150))
+
+
+def test_cached_result_is_marked_with_age():
+    cache = ResponseCache(max_entries=10, ttl=60)
+    cache.put(live_result())
+
+    result = cache.get(1)
+
+    assert result.cached
+    assert 0 <= result.cache_age < 60
+    assert result.price_info.price == 120
+
+
+def test_live_result_is_not_marked():
+    result = live_result()
+
+    assert not result.cached
+    assert result.cache_age is None
+
+
+def test_cached_result_is_projected_to_fields():
+    cache = ResponseCache(max_entries=10, ttl=60)
+    cache.put(live_result())
+
+    result = cache.get(1, {"title"})
+
+    assert result.title == "Товар"
+    assert result.price_info is None
+    assert result.cached
@@ -0,0 +1,27 @@
+from starlette.requests import Request
+
+from utils.responses import wants_msgpack
+
+
+def request_with_accept(accept):
+    return Request({"type": "http", "headers": [(b"accept", accept.encode())]})
+
+
+def test_msgpack_requested_explicitly():
+    assert wants_msgpack(request_with_accept("application/msgpack"))
+    assert wants_msgpack(request_with_accept("application/x-msgpack, application/json;q=0.5"))
+
+
+def test_msgpack_with_zero_quality_is_refused():
+    assert not wants_msgpack(request_with_accept("application/msgpack;q=0, application/json"))
+    assert not wants_msgpack(request_with_accept("application/msgpack; q=0"))
+
+
+def test_json_preferred_by_quality():
+    assert not wants_msgpack(request_with_accept("application/msgpack;q=0.5, */*"))
+    assert wants_msgpack(request_with_accept("application/json;q=0.3, application/msgpack;q=0.8"))
+
+
+def test_wildcards_alone_get_json():
+    assert not wants_msgpack(request_with_accept("*/*"))
+    assert not wants_msgpack(request_with_accept(""))
@@ -0,0 +1,25 @@
+from driver_manager.standby_pool import StandbyPool
+
+
+def test_target_follows_peak_batch_demand():
+    pool = StandbyPool(size=4, max_age=1800, demand_window=900)
+    pool._demand.extend([1000.0, 1000.5, 1001.0, 1500.0])
+    pool._started = 0
+
+    # Первый батч — три воркера, второй — один: держим три запасных
+    pool.demand_window = 1e12
+    assert pool.target() == 3
+
+
+def test_target_is_capped_by_size():
+    pool = StandbyPool(size=2, max_age=1800, demand_window=1e12)
+    pool._demand.extend([1000.0 + i for i in range(5)])
+
+    assert pool.target() == 2
+
+
+def test_no_recent_demand_keeps_no_spares():
+    pool = StandbyPool(size=2, max_age=1800, demand_window=900)
+    pool._started = 0
+
+    assert pool.target() == 0
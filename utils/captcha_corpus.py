@@ -0,0 +1,64 @@
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_FILE = "background.png"
+PUZZLE_FILE = "puzzle.png"
+META_FILE = "meta.json"
+
+
+def save_captcha_sample(corpus_dir: str, bg_image, puzzle_image, meta: Dict[str, Any],
+                        context: str = "captcha") -> Optional[str]:
+    """
+    Сохраняет пару изображений капчи и метаданные решения в отдельную папку корпуса.
+
+    meta должен содержать scale, container_width, puzzle_left, puzzle_top и solved_offset
+    (смещение слайдера, которое сработало, или None, если капча не решена).
+    """
+    try:
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        sample_dir = os.path.join(corpus_dir, f"{timestamp}_{context}_{uuid.uuid4().hex[:6]}")
+        os.makedirs(sample_dir, exist_ok=True)
+
+        Image.fromarray(bg_image).save(os.path.join(sample_dir, BACKGROUND_FILE))
+        Image.fromarray(puzzle_image).save(os.path.join(sample_dir, PUZZLE_FILE))
+
+        with open(os.path.join(sample_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({**meta, "context": context, "saved_at": timestamp}, f, ensure_ascii=False, indent=2)
+
+        logger.info("Captcha sample saved to %s (solved_offset=%s)", sample_dir, meta.get("solved_offset"))
+        return sample_dir
+    except Exception as e:
+        logger.warning("Failed to save captcha sample: %s", e)
+        return None
+
+
+def load_corpus(corpus_dir: str) -> Iterator[Dict[str, Any]]:
+    """Перебирает сохранённые образцы: {'path', 'background', 'puzzle', 'meta'}"""
+    if not os.path.isdir(corpus_dir):
+        return
+
+    for name in sorted(os.listdir(corpus_dir)):
+        sample_dir = os.path.join(corpus_dir, name)
+        meta_path = os.path.join(sample_dir, META_FILE)
+        if not os.path.isfile(meta_path):
+            continue
+
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            background = np.array(Image.open(os.path.join(sample_dir, BACKGROUND_FILE)))
+            puzzle = np.array(Image.open(os.path.join(sample_dir, PUZZLE_FILE)))
+        except Exception as e:
+            logger.warning("Skipping broken captcha sample %s: %s", sample_dir, e)
+            continue
+
+        yield {"path": sample_dir, "background": background, "puzzle": puzzle, "meta": meta}
@@ -0,0 +1,88 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def get_captcha_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    Общий пул процессов для компьютерного зрения капчи.
+    None, если пул отключён (CAPTCHA_POOL_SIZE=0).
+    """
+    global _executor
+
+    if settings.CAPTCHA_POOL_SIZE <= 0:
+        return None
+
+    with _lock:
+        if _executor is None:
+            # spawn: не форкаем процесс с потоками воркеров и дескрипторами Chrome
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.CAPTCHA_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info("Captcha process pool started with %d processes", settings.CAPTCHA_POOL_SIZE)
+        return _executor
+
+
+def _reset_executor(broken: ProcessPoolExecutor) -> None:
+    global _executor
+    with _lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def run_captcha_vision(func, *args):
+    """
+    Выполняет тяжёлую функцию OpenCV (estimate_puzzle_offset, find_best_match_template, ...)
+    в пуле процессов, чтобы воркеры не конкурировали за GIL во время волны капч.
+    Функция должна быть объявлена на уровне модуля. Если пул недоступен — считаем в текущем потоке.
+    """
+    executor = get_captcha_executor()
+    if executor is None:
+        return func(*args)
+
+    try:
+        return executor.submit(func, *args).result(timeout=settings.CAPTCHA_POOL_TIMEOUT)
+    except BrokenProcessPool as e:
+        logger.warning("Captcha process pool is broken, restarting it: %s", e)
+        _reset_executor(executor)
+    except Exception as e:
+        logger.warning("Captcha vision in process pool failed (%s), computing in-thread", e)
+
+    return func(*args)
+
+
+def warm_up_captcha_pool() -> None:
+    """Запускает процессы пула заранее, чтобы первая капча не ждала импорта OpenCV"""
+    executor = get_captcha_executor()
+    if executor is None:
+        return
+    try:
+        for _ in range(settings.CAPTCHA_POOL_SIZE):
+            executor.submit(_warm_up_worker)
+    except Exception as e:
+        logger.warning("Failed to warm up captcha process pool: %s", e)
+
+
+def _warm_up_worker() -> None:
+    import utils.image_utils  # noqa: F401
+
+
+def shutdown_captcha_pool() -> None:
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Captcha process pool stopped")
@@ -5,13 +5,17 @@ import io
 import time
 import random
 import logging
-import requests
 from PIL import Image
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import base64
+from config.settings import settings
+from utils.image_utils import estimate_puzzle_offset
+from utils.captcha_corpus import save_captcha_sample
+from utils.captcha_pool import run_captcha_vision
+from utils.captcha_stats import captcha_offset_stats
 
 logger = logging.getLogger(__name__)
 
@@ -19,10 +23,21 @@ logger = logging.getLogger(__name__)
 class OzonCaptchaSolverV3:
     """Продвинутый решатель капчи Ozon с одним непрерывным движением"""
 
-    def __init__(self, driver):
+    # Разброс вокруг оценки, если уверенность ниже CAPTCHA_CONFIDENCE_THRESHOLD
+    FALLBACK_DELTAS = [-5, 5, -10, 10]
+    # Доли ширины контейнера для быстрого перебора без оценки по изображениям
+    RAPID_FIRE_PERCENTS = [0.8, 0.85, 0.88, 0.9, 0.92, 0.94]
+
+    def __init__(self, driver, corpus_dir=None):
         self.driver = driver
         self.scale = 1.0
         self.container_width = 0
+        self.last_confidence = None
+        self.alternative_offset = None
+        self.last_puzzle_left = None
+        self.last_puzzle_top = None
+        # Папка корпуса: если задана, пары изображений и сработавшее смещение сохраняются
+        self.corpus_dir = corpus_dir
 
     def get_scale_factor(self):
         """Получает масштаб из стиля капчи"""
@@ -53,98 +68,166 @@ class OzonCaptchaSolverV3:
             return self.container_width
         except Exception as e:
             logger.error(f"Error getting container width: {e}")
-            return 480  # Значение по умолчанию
-
-    def download_captcha_images(self):
-        """Скачивает изображения капчи для анализа"""
-        try:
-            # Получаем элементы изображений
-            bg_element = self.driver.find_element(By.ID, "image")
-            puzzle_element = self.driver.find_element(By.ID, "puzzle")
-
-            # Получаем URL изображений
-            bg_url = bg_element.get_attribute("src")
-            puzzle_url = puzzle_element.get_attribute("src")
-
-            logger.info(f"Downloading captcha images...")
+            self.container_width = 480  # Значение по умолчанию
+            return self.container_width
 
-            # Скачиваем изображения
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    # Читает уже загруженные в странице изображения: сначала через canvas,
+    # а если canvas "испорчен" CORS — через fetch из самой страницы (кэш браузера,
+    # тот же прокси и куки). Возвращает {id: {data|error, source}}.
+    READ_IMAGES_SCRIPT = """
+        var ids = arguments[0];
+        var done = arguments[arguments.length - 1];
+
+        function fromCanvas(img) {
+            try {
+                if (!img.complete || !img.naturalWidth) return null;
+                var canvas = document.createElement('canvas');
+                canvas.width = img.naturalWidth;
+                canvas.height = img.naturalHeight;
+                canvas.getContext('2d').drawImage(img, 0, 0);
+                return canvas.toDataURL('image/png').split(',')[1];
+            } catch (e) {
+                return null;
             }
+        }
+
+        function fromFetch(img) {
+            return fetch(img.currentSrc || img.src, {cache: 'force-cache', credentials: 'include'})
+                .then(function(r) { return r.blob(); })
+                .then(function(blob) {
+                    return new Promise(function(resolve, reject) {
+                        var reader = new FileReader();
+                        reader.onloadend = function() { resolve(reader.result.split(',')[1]); };
+                        reader.onerror = reject;
+                        reader.readAsDataURL(blob);
+                    });
+                });
+        }
+
+        Promise.all(ids.map(function(id) {
+            var img = document.getElementById(id);
+            if (!img) return Promise.resolve({id: id, error: 'element not found'});
+            var data = fromCanvas(img);
+            if (data) return Promise.resolve({id: id, data: data, source: 'canvas'});
+            return fromFetch(img)
+                .then(function(d) { return {id: id, data: d, source: 'fetch'}; })
+                .catch(function(e) { return {id: id, error: String(e)}; });
+        })).then(function(items) {
+            var result = {};
+            items.forEach(function(item) { result[item.id] = item; });
+            done(result);
+        });
+    """
+
+    def read_images_from_page(self, element_ids):
+        """Получает изображения капчи из браузера без отдельного сетевого запроса"""
+        raw = self.driver.execute_async_script(self.READ_IMAGES_SCRIPT, list(element_ids))
+
+        images = {}
+        for element_id in element_ids:
+            item = (raw or {}).get(element_id) or {}
+            if not item.get("data"):
+                raise RuntimeError(f"Could not read image #{element_id}: {item.get('error', 'no data')}")
+
+            image = Image.open(io.BytesIO(base64.b64decode(item["data"])))
+            image_np = np.array(image)
+            if len(image_np.shape) == 2:
+                image_np = cv2.cvtColor(image_np, cv2.COLOR_GRAY2RGB)
+
+            logger.info(f"Captcha image #{element_id} read via {item.get('source')}: {image_np.shape}")
+            images[element_id] = image_np
+
+        return images
 
-            # Скачиваем фон
-            bg_response = requests.get(bg_url, headers=headers, timeout=10)
-            bg_image = Image.open(io.BytesIO(bg_response.content))
-            bg_np = np.array(bg_image)
-
-            # Скачиваем пазл
-            puzzle_response = requests.get(puzzle_url, headers=headers, timeout=10)
-            puzzle_image = Image.open(io.BytesIO(puzzle_response.content))
-            puzzle_np = np.array(puzzle_image)
-
-            # Конвертируем в RGB если нужно
-            if len(bg_np.shape) == 2:
-                bg_np = cv2.cvtColor(bg_np, cv2.COLOR_GRAY2RGB)
-            if len(puzzle_np.shape) == 2:
-                puzzle_np = cv2.cvtColor(puzzle_np, cv2.COLOR_GRAY2RGB)
+    def download_captcha_images(self):
+        """Получает изображения капчи, уже загруженные в странице"""
+        try:
+            images = self.read_images_from_page(("image", "puzzle"))
+            bg_np, puzzle_np = images["image"], images["puzzle"]
 
             logger.info(f"Background: {bg_np.shape}, Puzzle: {puzzle_np.shape}")
             return bg_np, puzzle_np
 
         except Exception as e:
-            logger.error(f"Error downloading images: {e}")
+            logger.error(f"Error reading captcha images from page: {e}")
             return None, None
 
-    def calculate_precise_offset(self, bg_image, puzzle_image):
-        """Точно вычисляет необходимое смещение слайдера"""
-        try:
-            # Конвертируем в оттенки серого
-            bg_gray = cv2.cvtColor(bg_image, cv2.COLOR_RGB2GRAY)
-            puzzle_gray = cv2.cvtColor(puzzle_image, cv2.COLOR_RGB2GRAY)
+    def get_puzzle_left(self):
+        """Текущее положение пазла (left, px) из DOM"""
+        puzzle_element = self.driver.find_element(By.ID, "puzzle")
+        style = puzzle_element.get_attribute("style")
 
-            # Улучшаем контраст
-            bg_gray = cv2.equalizeHist(bg_gray)
-            puzzle_gray = cv2.equalizeHist(puzzle_gray)
+        import re
+        left_match = re.search(r'left:\s*(\d+)px', style)
+        return int(left_match.group(1)) if left_match else 11
 
-            # Применяем Gaussian blur для удаления шума
-            bg_gray = cv2.GaussianBlur(bg_gray, (3, 3), 0)
-            puzzle_gray = cv2.GaussianBlur(puzzle_gray, (3, 3), 0)
+    def get_puzzle_top(self):
+        """Текущее положение пазла по вертикали (top, px) из DOM или None"""
+        try:
+            style = self.driver.find_element(By.ID, "puzzle").get_attribute("style")
 
-            # Используем template matching
-            result = cv2.matchTemplate(bg_gray, puzzle_gray, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            import re
+            top_match = re.search(r'top:\s*(\d+)px', style)
+            return int(top_match.group(1)) if top_match else None
+        except Exception:
+            return None
 
-            target_x = max_loc[0]
+    def image_x_to_slider_offset(self, target_x, current_left, bg_width, puzzle_width):
+        """Переводит x-позицию пазла на изображении в смещение слайдера"""
+        # Конвертируем в координаты изображения с учетом масштаба
+        current_x_image = current_left / self.scale
 
-            # Получаем текущее положение пазла из DOM
-            puzzle_element = self.driver.find_element(By.ID, "puzzle")
-            style = puzzle_element.get_attribute("style")
+        # Максимальное возможное смещение пазла
+        max_puzzle_offset = bg_width - puzzle_width
+        if max_puzzle_offset <= 0:
+            return None
 
-            import re
-            left_match = re.search(r'left:\s*(\d+)px', style)
-            current_left = int(left_match.group(1)) if left_match else 11
+        offset_px = target_x - current_x_image
+        return (offset_px / max_puzzle_offset) * self.container_width
 
-            # Конвертируем в координаты изображения с учетом масштаба
-            current_x_image = current_left / self.scale
+    def calculate_precise_offset(self, bg_image, puzzle_image, current_left=None, current_top=None):
+        """
+        Вычисляет смещение слайдера одной оценкой по контурам (см. estimate_puzzle_offset).
+        Уверенность сохраняется в last_confidence, запасной кандидат — в alternative_offset.
+        current_left/current_top берутся из DOM, если не переданы (при офлайн-прогоне корпуса).
+        """
+        self.last_confidence = None
+        self.alternative_offset = None
 
-            # Вычисляем необходимое смещение в пикселях изображения
-            offset_px = target_x - current_x_image
+        try:
+            if current_left is None:
+                current_left = self.get_puzzle_left()
+                current_top = self.get_puzzle_top()
+            self.last_puzzle_left = current_left
+            self.last_puzzle_top = current_top
+
+            # Известная из DOM высота пазла сужает поиск до полосы строк
+            y_hint = current_top / self.scale if current_top is not None else None
+
+            # OpenCV считаем в пуле процессов, поток браузера только двигает слайдер
+            estimate = run_captcha_vision(estimate_puzzle_offset, bg_image, puzzle_image, y_hint,
+                                          settings.CAPTCHA_PYRAMID_LEVELS)
+            if estimate is None:
+                logger.error("Puzzle is larger than background, cannot estimate offset")
+                return None
 
-            # Вычисляем максимальное возможное смещение пазла
+            target_x, confidence, second_x = estimate
             bg_width = bg_image.shape[1]
             puzzle_width = puzzle_image.shape[1]
-            max_puzzle_offset = bg_width - puzzle_width
 
-            if max_puzzle_offset <= 0:
+            slider_offset = self.image_x_to_slider_offset(target_x, current_left, bg_width, puzzle_width)
+            if slider_offset is None:
                 logger.error("Invalid image dimensions")
                 return None
 
-            # Конвертируем смещение в пиксели слайдера
-            slider_offset = (offset_px / max_puzzle_offset) * self.container_width
+            self.last_confidence = confidence
+            if second_x is not None:
+                self.alternative_offset = self.image_x_to_slider_offset(
+                    second_x, current_left, bg_width, puzzle_width
+                )
 
-            logger.info(f"Calculation: target_x={target_x}, current_x={current_x_image}, "
-                        f"offset_px={offset_px:.1f}, slider_offset={slider_offset:.1f}px")
+            logger.info(f"Calculation: target_x={target_x:.2f}, current_left={current_left}, "
+                        f"slider_offset={slider_offset:.1f}px, confidence={confidence:.2f}")
 
             return slider_offset
 
@@ -152,6 +235,21 @@ class OzonCaptchaSolverV3:
             logger.error(f"Error calculating offset: {e}")
             return None
 
+    def record_sample(self, bg_image, puzzle_image, estimated_offset, solved_offset):
+        """Сохраняет образец в корпус для офлайн-оценки решателя (если корпус включён)"""
+        if not self.corpus_dir:
+            return
+
+        save_captcha_sample(self.corpus_dir, bg_image, puzzle_image, {
+            "scale": self.scale,
+            "container_width": self.container_width,
+            "puzzle_left": self.last_puzzle_left,
+            "puzzle_top": self.last_puzzle_top,
+            "estimated_offset": estimated_offset,
+            "confidence": self.last_confidence,
+            "solved_offset": solved_offset,
+        })
+
     def get_slider_element(self):
         """Находит и возвращает элемент слайдера"""
         try:
@@ -228,10 +326,24 @@ class OzonCaptchaSolverV3:
             logger.error(f"Error in single drag: {e}")
             return False
 
+    @staticmethod
+    def unique_offsets(candidates):
+        """Округляет смещения и убирает дубликаты, сохраняя порядок кандидатов"""
+        seen = set()
+        unique = []
+        for arm, offset in candidates:
+            offset = int(round(offset))
+            if offset not in seen:
+                seen.add(offset)
+                unique.append((arm, offset))
+        return unique
+
     def solve_with_intelligent_offsets(self):
-        """Интеллектуальное решение с диапазоном смещений"""
+        """Решение по одной оценке смещения: один-два drag вместо перебора"""
         try:
             logger.info("Starting intelligent solution")
+            self.last_confidence = None
+            self.alternative_offset = None
 
             # 1. Получаем параметры
             self.get_scale_factor()
@@ -249,30 +361,28 @@ class OzonCaptchaSolverV3:
                 logger.error("Failed to calculate base offset")
                 return False
 
-            # 4. Генерируем диапазон смещений вокруг базового
-            offsets_to_try = []
-
-            # Основное смещение
-            offsets_to_try.append(base_offset)
+            # 4. Кандидаты: при уверенной оценке — сама оценка и следующий по силе пик,
+            # иначе ещё и небольшой разброс вокруг оценки
+            candidates = [("estimate", base_offset)]
 
-            # Смещения на ±10, ±20 пикселей
-            for delta in [-20, -15, -10, -5, 5, 10, 15, 20]:
-                offset = base_offset + delta
-                if 10 < offset < self.container_width - 50:
-                    offsets_to_try.append(offset)
+            if self.last_confidence < settings.CAPTCHA_CONFIDENCE_THRESHOLD:
+                logger.info(f"Low confidence {self.last_confidence:.2f}, adding fallback offsets")
+                for delta in self.FALLBACK_DELTAS:
+                    offset = base_offset + delta
+                    if 10 < offset < self.container_width - 50:
+                        candidates.append((f"delta:{delta}", offset))
 
-            # Добавляем эвристические смещения (проценты от ширины)
-            for percent in [0.7, 0.75, 0.8, 0.85, 0.88, 0.9, 0.92]:
-                offset = self.container_width * percent
-                offsets_to_try.append(offset)
+            if self.alternative_offset is not None and 10 < self.alternative_offset < self.container_width:
+                candidates.append(("alternative", self.alternative_offset))
 
-            # Убираем дубликаты и сортируем
-            offsets_to_try = sorted(list(set([int(o) for o in offsets_to_try])))
+            # Порядок — по тому, что чаще срабатывало на капчах той же геометрии
+            stats_key = captcha_offset_stats.make_key(self.container_width, self.scale)
+            offsets_to_try = self.unique_offsets(captcha_offset_stats.order(stats_key, candidates))
             logger.info(f"Offsets to try: {offsets_to_try}")
 
             # 5. Пробуем смещения
-            for offset in offsets_to_try:
-                logger.info(f"Trying offset: {offset}px")
+            for arm, offset in offsets_to_try:
+                logger.info(f"Trying offset: {offset}px ({arm})")
 
                 # Получаем свежий элемент слайдера для каждой попытки
                 slider = self.get_slider_element()
@@ -293,12 +403,17 @@ class OzonCaptchaSolverV3:
                     # Проверяем успех
                     if self.check_success():
                         logger.info(f"Success with offset {offset}px")
+                        captcha_offset_stats.record(stats_key, arm, True)
+                        self.record_sample(bg_image, puzzle_image, base_offset, offset)
                         return True
 
+                    captcha_offset_stats.record(stats_key, arm, False)
+
                     # Если не сработало, ждем немного перед следующей попыткой
                     time.sleep(0.5)
 
             logger.warning("All offsets failed")
+            self.record_sample(bg_image, puzzle_image, base_offset, None)
             return False
 
         except Exception as e:
@@ -310,20 +425,18 @@ class OzonCaptchaSolverV3:
         try:
             logger.info("Starting rapid fire solution")
 
+            self.get_scale_factor()
             self.get_container_width()
 
-            # Быстрые эвристические смещения
-            quick_offsets = [
-                int(self.container_width * 0.8),
-                int(self.container_width * 0.85),
-                int(self.container_width * 0.88),
-                int(self.container_width * 0.9),
-                int(self.container_width * 0.92),
-                int(self.container_width * 0.94)
-            ]
+            # Быстрые эвристические смещения, самые удачные для этой геометрии — первыми
+            stats_key = captcha_offset_stats.make_key(self.container_width, self.scale)
+            quick_offsets = self.unique_offsets(captcha_offset_stats.order(
+                stats_key,
+                [(f"pct:{percent}", self.container_width * percent) for percent in self.RAPID_FIRE_PERCENTS]
+            ))
 
-            for offset in quick_offsets:
-                logger.info(f"Rapid fire trying: {offset}px")
+            for arm, offset in quick_offsets:
+                logger.info(f"Rapid fire trying: {offset}px ({arm})")
 
                 slider = self.get_slider_element()
                 if not slider:
@@ -346,8 +459,11 @@ class OzonCaptchaSolverV3:
 
                 if self.check_success():
                     logger.info(f"Rapid fire success with {offset}px")
+                    captcha_offset_stats.record(stats_key, arm, True)
                     return True
 
+                captcha_offset_stats.record(stats_key, arm, False)
+
             return False
 
         except Exception as e:
@@ -409,10 +525,12 @@ class OzonCaptchaSolverV3:
             if self.solve_with_intelligent_offsets():
                 return True
 
-            # Если не сработало, пробуем быстрый метод
-            logger.info("Intelligent method failed, trying rapid fire")
-            if self.solve_with_rapid_fire():
-                return True
+            # Перебор эвристик имеет смысл, только если оценить смещение
+            # по изображениям не удалось вовсе
+            if self.last_confidence is None:
+                logger.info("Offset estimation unavailable, trying rapid fire")
+                if self.solve_with_rapid_fire():
+                    return True
 
             if attempt < max_attempts:
                 logger.info(f"Waiting before next attempt...")
@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CaptchaOffsetStats:
+    """
+    Статистика успешности кандидатов смещения капчи (многорукий бандит).
+
+    Рука — источник кандидата: "estimate", "alternative", "delta:-5", "pct:0.88".
+    Статистика ведётся отдельно для каждой геометрии капчи (ширина контейнера и масштаб),
+    кандидаты сортируются по апостериорной вероятности успеха Beta(1 + успехи, 1 + неудачи).
+    """
+
+    def __init__(self, stats_file: Optional[str] = None):
+        self.stats_file = Path(stats_file) if stats_file else None
+        self._lock = threading.Lock()
+        # key -> arm -> [успехов, попыток]
+        self._stats: Dict[str, Dict[str, List[int]]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.stats_file or not self.stats_file.exists():
+            return
+
+        try:
+            with self.stats_file.open("r", encoding="utf-8") as file:
+                self._stats = json.load(file)
+            logger.info("Loaded captcha offset stats for %d geometries from %s",
+                        len(self._stats), self.stats_file)
+        except Exception as exc:
+            logger.warning("Failed to load captcha offset stats: %s", exc)
+            self._stats = {}
+
+    def _save(self) -> None:
+        if not self.stats_file:
+            return
+
+        try:
+            self.stats_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.stats_file.with_suffix(".tmp")
+            with tmp_path.open("w", encoding="utf-8") as file:
+                json.dump(self._stats, file, indent=2)
+            os.replace(tmp_path, self.stats_file)
+        except Exception as exc:
+            logger.warning("Failed to save captcha offset stats: %s", exc)
+
+    @staticmethod
+    def make_key(container_width: float, scale: float) -> str:
+        return f"{int(round(container_width))}@{scale:.2f}"
+
+    def success_probability(self, key: str, arm: str) -> float:
+        with self._lock:
+            successes, attempts = self._stats.get(key, {}).get(arm, (0, 0))
+        return (successes + 1) / (attempts + 2)
+
+    def order(self, key: str, candidates: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        """
+        Сортирует кандидаты (рука, смещение) по убыванию вероятности успеха.
+        Сортировка стабильная: без статистики сохраняется исходный порядок.
+        """
+        return sorted(candidates, key=lambda candidate: -self.success_probability(key, candidate[0]))
+
+    def record(self, key: str, arm: str, success: bool) -> None:
+        with self._lock:
+            arm_stats = self._stats.setdefault(key, {}).setdefault(arm, [0, 0])
+            arm_stats[1] += 1
+            if success:
+                arm_stats[0] += 1
+            self._save()
+
+
+captcha_offset_stats = CaptchaOffsetStats(settings.CAPTCHA_STATS_PATH)
@@ -0,0 +1,130 @@
+import gzip
+import logging
+from typing import Iterable, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен — без него отдаём только gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Выбирает кодировку сжатия по заголовку Accept-Encoding.
+    Предпочитаем br (если установлен brotli), затем gzip.
+    """
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token] = quality
+
+    def allowed(name: str) -> bool:
+        return accepted.get(name, accepted.get("*", 0.0)) > 0
+
+    if brotli is not None and allowed("br"):
+        return "br"
+    if allowed("gzip"):
+        return "gzip"
+    return None
+
+
+def compress_body(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware: сжимает ответы gzip/brotli по Accept-Encoding клиента.
+
+    Сжимаются только целиком сформированные ответы (JSON результатов) размером
+    от minimum_size байт; потоковые ответы и уже сжатые тела пропускаются как есть.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5,
+                 paths: Optional[Iterable[str]] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.paths = tuple(paths) if paths else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.paths and not scope.get("path", "").startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = dict(message.get("headers", []))
+                if b"content-encoding" in headers:
+                    passthrough = True
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                # Потоковый ответ: отдаём без сжатия, чтобы не буферизовать его целиком
+                if len(chunks) == 1:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                return
+
+            body = b"".join(chunks)
+            headers = [(k, v) for k, v in start_message.get("headers", []) if k != b"content-length"]
+
+            if len(body) >= self.minimum_size:
+                compressed = compress_body(body, encoding, self.gzip_level, self.brotli_quality)
+                if len(compressed) < len(body):
+                    body = compressed
+                    headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"vary", b"Accept-Encoding"))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -3,6 +3,7 @@ import re
 import logging
 from typing import Optional, Dict, Any
 from models.schemas import PriceInfo, SellerInfo
+from config.settings import settings
 
 
 logger = logging.getLogger(__name__)
@@ -69,7 +70,7 @@ def find_seller_name(widget_states: Dict[str, Any]) -> Optional[str]:
 
 
 def build_ozon_api_url(article: int) -> str:
-    base_url = "https://www.ozon.ru/api/composer-api.bx/page/json/v2"
+    base_url = settings.OZON_API_URL
     product_url = f"/product/{article}/"
     url = f"{base_url}?url={product_url}"
     return url
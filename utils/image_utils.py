@@ -21,8 +21,22 @@ def enhance_captcha_image(image):
     return denoised
 
 
-def find_best_match_template(background, template):
-    """Находит лучшее совпадение шаблона на изображении"""
+# Запас по вертикали вокруг известной из DOM позиции пазла, px
+ROW_BAND_PADDING = 6
+
+
+def _row_band(height, top, band_height, padding=ROW_BAND_PADDING):
+    """Границы полосы строк [start, end) вокруг известной y-позиции или None"""
+    if top is None:
+        return None
+    start = max(0, int(top) - padding)
+    end = min(height, int(top) + band_height + padding)
+    if end - start < band_height:
+        return None
+    return start, end
+
+
+def _match_all_methods(background, template):
     methods = [
         ('TM_CCOEFF_NORMED', cv2.TM_CCOEFF_NORMED),
         ('TM_CCORR_NORMED', cv2.TM_CCORR_NORMED),
@@ -49,4 +63,200 @@ def find_best_match_template(background, template):
             best_location = location
             best_method = method_name
 
-    return best_location, best_score, best_method
\ No newline at end of file
+    return best_location, best_score, best_method
+
+
+def _top_columns(profile, count, window):
+    """Индексы count лучших пиков профиля с подавлением соседей в пределах window"""
+    profile = profile.copy()
+    peaks = []
+    for _ in range(count):
+        index = int(np.argmax(profile))
+        if profile[index] <= -1.0:
+            break
+        peaks.append(index)
+        profile[max(0, index - window):index + window + 1] = -1.0
+    return peaks
+
+
+def find_best_match_template(background, template, y_hint=None, pyramid_levels=0, candidates=3, band=4):
+    """
+    Находит лучшее совпадение шаблона на изображении.
+
+    y_hint — известная (из DOM) y-позиция шаблона на фоне: поиск ограничивается
+    полосой строк вокруг неё. pyramid_levels > 0 включает поиск от грубого к точному:
+    кандидаты ищутся на уменьшенном изображении, а три метода сравнения на полном
+    разрешении запускаются только в узких окнах ±band (в пикселях уровня) вокруг них.
+    """
+    row_offset = 0
+    rows = _row_band(background.shape[0], y_hint, template.shape[0])
+    if rows is not None:
+        background = background[rows[0]:rows[1]]
+        row_offset = rows[0]
+
+    factor = 2 ** pyramid_levels
+    if pyramid_levels <= 0 or min(template.shape[:2]) // factor < 8:
+        location, score, method = _match_all_methods(background, template)
+        return (location[0], location[1] + row_offset), score, method
+
+    small_background, small_template = background, template
+    for _ in range(pyramid_levels):
+        small_background = cv2.pyrDown(small_background)
+        small_template = cv2.pyrDown(small_template)
+
+    coarse = cv2.matchTemplate(small_background, small_template, cv2.TM_CCOEFF_NORMED)
+    columns = _top_columns(coarse.max(axis=0), candidates, max(1, small_template.shape[1] // 2))
+
+    best = None
+    template_width = template.shape[1]
+    for column in columns:
+        x_start = max(0, (column - band) * factor)
+        x_end = min(background.shape[1], (column + band) * factor + template_width)
+        if x_end - x_start < template_width:
+            continue
+
+        location, score, method = _match_all_methods(background[:, x_start:x_end], template)
+        if best is None or score > best[1]:
+            best = ((location[0] + x_start, location[1]), score, method)
+
+    if best is None:
+        location, score, method = _match_all_methods(background, template)
+        best = (location, score, method)
+
+    location, score, method = best
+    return (location[0], location[1] + row_offset), score, method
+
+
+def to_gray(image):
+    """Переводит RGB/RGBA/серое изображение в оттенки серого"""
+    if len(image.shape) == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+
+
+def puzzle_alpha_mask(puzzle):
+    """
+    Маска фигуры пазла: альфа-канал PNG, а если его нет — всё, что не
+    почти-чёрный фон вокруг фигуры
+    """
+    if len(puzzle.shape) == 3 and puzzle.shape[2] == 4:
+        mask = (puzzle[:, :, 3] > 32).astype(np.uint8) * 255
+    else:
+        mask = (to_gray(puzzle) > 8).astype(np.uint8) * 255
+
+    if not mask.any():
+        mask[:] = 255
+    return mask
+
+
+def gradient_magnitude(gray):
+    """Модуль градиента Собеля (float32)"""
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    gx = cv2.Sobel(blurred, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(blurred, cv2.CV_32F, 0, 1, ksize=3)
+    return cv2.magnitude(gx, gy)
+
+
+def _normalize(image):
+    image = image.astype(np.float32)
+    span = float(image.max() - image.min())
+    if span < 1e-6:
+        return np.zeros_like(image)
+    return (image - image.min()) / span
+
+
+def _subpixel_peak(scores, index):
+    """Уточняет положение максимума параболой по трём соседним точкам"""
+    if index <= 0 or index >= len(scores) - 1:
+        return 0.0
+    left, center, right = scores[index - 1], scores[index], scores[index + 1]
+    denominator = left - 2 * center + right
+    if abs(denominator) < 1e-9:
+        return 0.0
+    return float(np.clip(0.5 * (left - right) / denominator, -0.5, 0.5))
+
+
+def _column_scores(bg_edges, template, pyramid_levels=0, candidates=3, band=4):
+    """
+    Лучший отклик TM_CCOEFF_NORMED по каждой колонке фона. С pyramid_levels > 0
+    кандидаты ищутся на уменьшенных изображениях, а на полном разрешении считаются
+    только окна ±band (в пикселях уровня) вокруг них; остальные колонки — -1.
+    """
+    factor = 2 ** pyramid_levels
+    if pyramid_levels <= 0 or min(template.shape[:2]) // factor < 8:
+        return cv2.matchTemplate(bg_edges, template, cv2.TM_CCOEFF_NORMED).max(axis=0)
+
+    small_background, small_template = bg_edges, template
+    for _ in range(pyramid_levels):
+        small_background = cv2.pyrDown(small_background)
+        small_template = cv2.pyrDown(small_template)
+    coarse = cv2.matchTemplate(small_background, small_template, cv2.TM_CCOEFF_NORMED).max(axis=0)
+
+    template_width = template.shape[1]
+    scores = np.full(bg_edges.shape[1] - template_width + 1, -1.0, np.float32)
+    for column in _top_columns(coarse, candidates, max(1, small_template.shape[1] // 2)):
+        x_start = max(0, (column - band) * factor)
+        x_end = min(bg_edges.shape[1], (column + band) * factor + template_width)
+        if x_end - x_start < template_width:
+            continue
+        window = cv2.matchTemplate(bg_edges[:, x_start:x_end], template, cv2.TM_CCOEFF_NORMED).max(axis=0)
+        scores[x_start:x_start + len(window)] = np.maximum(scores[x_start:x_start + len(window)], window)
+    return scores
+
+
+def estimate_puzzle_offset(background, puzzle, y_hint=None, pyramid_levels=0):
+    """
+    Оценивает x-позицию пазла на фоне по контурам.
+
+    Шаблон — градиенты фигуры внутри альфа-маски плюс контур самой маски
+    (его повторяет край "дырки" на фоне); сравнивается с градиентами фона.
+    Позиция уточняется до долей пикселя. y_hint — y-позиция изображения пазла
+    на фоне (из DOM): поиск ограничивается полосой строк вокруг фигуры.
+    pyramid_levels > 0 — поиск от грубого к точному (см. _column_scores).
+
+    Возвращает (x, confidence, second_x): x — левый край изображения пазла
+    в координатах фона, confidence — уверенность 0..1 (высота пика и его отрыв
+    от следующего), second_x — следующий по силе кандидат. None, если оценить нельзя.
+    """
+    mask = puzzle_alpha_mask(puzzle)
+    ys, xs = np.nonzero(mask)
+    x0, x1, y0, y1 = xs.min(), xs.max() + 1, ys.min(), ys.max() + 1
+
+    piece_mask = mask[y0:y1, x0:x1]
+    piece_gray = to_gray(puzzle)[y0:y1, x0:x1]
+
+    outline = cv2.morphologyEx(piece_mask, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+    template = _normalize(gradient_magnitude(piece_gray) * (piece_mask > 0)) + _normalize(outline)
+    bg_edges = _normalize(gradient_magnitude(to_gray(background)))
+
+    # Градиенты считаем по всему фону, а обрезаем уже их — без ложных краёв на границе полосы
+    rows = _row_band(bg_edges.shape[0], None if y_hint is None else y_hint + y0, template.shape[0])
+    if rows is not None:
+        bg_edges = bg_edges[rows[0]:rows[1]]
+
+    if template.shape[0] > bg_edges.shape[0] or template.shape[1] > bg_edges.shape[1]:
+        return None
+
+    # Лучший отклик по каждой колонке — дальше работаем с одномерным профилем по x
+    column_scores = _column_scores(bg_edges, template, pyramid_levels)
+    best_col = int(np.argmax(column_scores))
+    peak = float(column_scores[best_col])
+    x = best_col + _subpixel_peak(column_scores, best_col)
+
+    # Второй пик вне окна вокруг первого — мера однозначности совпадения
+    window = max(3, template.shape[1] // 2)
+    suppressed = column_scores.copy()
+    suppressed[max(0, best_col - window):best_col + window + 1] = -1.0
+    second_col = int(np.argmax(suppressed))
+    second = float(suppressed[second_col])
+
+    if (suppressed < 0).all():
+        second_x, distinctiveness = None, 1.0
+    else:
+        second_x = float(second_col) - x0
+        distinctiveness = float(np.clip((peak - max(second, 0.0)) / max(peak, 1e-6), 0.0, 1.0))
+
+    confidence = float(np.sqrt(np.clip(peak, 0.0, 1.0) * distinctiveness))
+    return float(x) - x0, confidence, second_x
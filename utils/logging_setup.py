@@ -0,0 +1,126 @@
+import atexit
+import contextvars
+import logging
+import queue
+import random
+import sys
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from config.settings import settings
+
+try:
+    from pythonjsonlogger import jsonlogger
+except ImportError:  # без python-json-logger пишем обычный текст
+    jsonlogger = None
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+JSON_FORMAT = '%(asctime)s %(name)s %(levelname)s %(message)s %(request_id)s %(worker_id)s %(article)s'
+
+# Корреляционные id: запрос, воркер и артикул, в контексте которых записан лог
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+worker_id_var: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("worker_id", default=None)
+article_var: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("article", default=None)
+
+# extra для записей горячего цикла, которые можно сэмплировать (LOG_SAMPLING)
+SAMPLED = {"sampled": True}
+
+_listener: Optional[QueueListener] = None
+
+
+@contextmanager
+def log_context(**values):
+    """Устанавливает request_id / worker_id / article на время блока"""
+    variables = {"request_id": request_id_var, "worker_id": worker_id_var, "article": article_var}
+    tokens = [(variables[name], variables[name].set(value)) for name, value in values.items()]
+    try:
+        yield
+    finally:
+        for variable, token in reversed(tokens):
+            variable.reset(token)
+
+
+class CorrelationFilter(logging.Filter):
+    """Добавляет в запись корреляционные id из контекста потока, который пишет лог"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.worker_id = worker_id_var.get()
+        record.article = article_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю помеченных SAMPLED INFO/DEBUG-записей для шумных логгеров (rates: имя логгера -> доля).
+    Правило логгера действует и на дочерние логгеры. Непомеченные записи и WARNING и выше проходят всегда.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._cache: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not getattr(record, "sampled", False):
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+def _build_formatter() -> logging.Formatter:
+    if settings.LOG_FORMAT == "json":
+        if jsonlogger is not None:
+            return jsonlogger.JsonFormatter(JSON_FORMAT, rename_fields={"levelname": "level", "asctime": "time"},
+                                            json_ensure_ascii=False)
+        logging.getLogger(__name__).warning("python-json-logger is not installed, using text logs")
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def setup_logging() -> None:
+    """
+    Логи через очередь: потоки воркеров только кладут запись в очередь,
+    форматирование и вывод делает отдельный поток QueueListener.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(_build_formatter())
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = QueueHandler(log_queue)
+    # Сэмплинг до постановки в очередь, чтобы отброшенные записи ничего не стоили
+    queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLING))
+    queue_handler.addFilter(CorrelationFilter())
+
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    root.addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Дописывает оставшиеся в очереди записи"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,120 @@
+import logging
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+except ImportError:  # prometheus_client необязателен — без него метрики не собираются
+    Counter = Gauge = Histogram = None
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    generate_latest = None
+
+logger = logging.getLogger(__name__)
+
+# Этапы занимают от долей секунды (разбор JSON) до минут (капча)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120, 240)
+
+
+class _NoopMetric:
+    """Заглушка с интерфейсом метрик prometheus_client"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def remove(self, *labels):
+        pass
+
+    def time(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _metric(factory, *args, **kwargs):
+    return factory(*args, **kwargs) if factory is not None else _NoopMetric()
+
+
+STAGE_SECONDS = _metric(
+    Histogram, "ozon_stage_seconds",
+    "Time spent in parser stages: setup_driver, warmup_navigation, composer_navigation, composer_fetch, "
+    "wait_json, extract_price_info, captcha_recovery, sleep",
+    ["stage"], buckets=STAGE_BUCKETS,
+)
+ARTICLE_SECONDS = _metric(
+    Histogram, "ozon_article_seconds", "Total time per article including retries",
+    buckets=STAGE_BUCKETS,
+)
+ARTICLES_TOTAL = _metric(
+    Counter, "ozon_articles_total",
+    "Parsed articles by outcome: success, captcha, blocked, no_json, parse_failure, error",
+    ["outcome"],
+)
+ARTICLE_RETRIES_TOTAL = _metric(Counter, "ozon_article_retries_total", "Article attempts after the first one")
+CAPTCHA_RECOVERIES_TOTAL = _metric(
+    Counter, "ozon_captcha_recoveries_total", "Captcha recoveries by strategy and result",
+    ["strategy", "result"],
+)
+ACTIVE_WORKERS = _metric(Gauge, "ozon_active_workers", "Workers with a running browser")
+QUEUE_DEPTH = _metric(Gauge, "ozon_queue_depth", "Articles assigned to workers but not started yet")
+ARTICLES_IN_FLIGHT = _metric(Gauge, "ozon_articles_in_flight", "Articles being parsed right now")
+WORKER_RSS_BYTES = _metric(
+    Gauge, "ozon_worker_browser_rss_bytes", "Resident memory of the worker's chromedriver and Chrome process tree",
+    ["worker"],
+)
+WORKER_CPU_PERCENT = _metric(
+    Gauge, "ozon_worker_browser_cpu_percent", "CPU usage of the worker's Chrome process tree between samples",
+    ["worker"],
+)
+WORKER_PROCESSES = _metric(Gauge, "ozon_worker_browser_processes", "Processes in the worker's Chrome tree", ["worker"])
+NETWORK_BYTES_TOTAL = _metric(
+    Counter, "ozon_worker_network_bytes_total", "Bytes received by the worker's browser (encoded, from CDP events)",
+    ["worker"],
+)
+BLOCKED_REQUESTS_TOTAL = _metric(
+    Counter, "ozon_worker_blocked_requests_total", "Browser requests blocked by the URL/resource blocklist",
+    ["worker"],
+)
+PROXY_NETWORK_BYTES_TOTAL = _metric(
+    Counter, "ozon_proxy_network_bytes_total", "Bytes received through each proxy (direct — no proxy)", ["proxy"],
+)
+PROXY_BUDGET_USED = _metric(
+    Gauge, "ozon_proxy_budget_used_ratio", "Share of the proxy's daily traffic budget used today", ["proxy"],
+)
+ARTICLE_BYTES = _metric(
+    Histogram, "ozon_article_network_bytes", "Bytes received per article including warm-up and retries",
+    buckets=(10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000),
+)
+BUDGET_SAVER_TOTAL = _metric(
+    Counter, "ozon_budget_saver_total", "Articles served by cheaper paths near the proxy budget: cache, fetch",
+    ["path"],
+)
+DRIVER_RECYCLES_TOTAL = _metric(
+    Counter, "ozon_driver_recycles_total", "Drivers restarted to free resources by reason: memory, articles",
+    ["reason"],
+)
+STANDBY_DRIVERS = _metric(Gauge, "ozon_standby_drivers", "Warm spare drivers ready for new workers")
+STANDBY_LEASES_TOTAL = _metric(
+    Counter, "ozon_standby_leases_total", "Worker driver requests to the standby pool by result: hit, miss",
+    ["result"],
+)
+
+
+def render_metrics() -> bytes:
+    """Метрики в текстовом формате Prometheus"""
+    if generate_latest is None:
+        return b"# prometheus_client is not installed\n"
+    return generate_latest()
@@ -0,0 +1,157 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from utils.metrics import WORKER_RSS_BYTES, WORKER_CPU_PERCENT, WORKER_PROCESSES
+
+try:
+    import psutil
+except ImportError:  # без psutil ресурсы браузеров не учитываются
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessTree:
+    """Процессы одного драйвера: chromedriver и браузер со всеми потомками (GPU, рендереры, сервис-воркеры)"""
+
+    def __init__(self, worker_id: int, pids: Iterable[int]):
+        self.worker_id = worker_id
+        self.roots = [psutil.Process(pid) for pid in pids if psutil.pid_exists(pid)]
+        self.started = time.time()
+        self.rss = 0
+        self.cpu_seconds = 0.0
+        self.cpu_percent = 0.0
+        self.processes = 0
+        self._sampled_at: Optional[float] = None
+        # Замер из воркера и при регистрации не должны перемешать cpu_seconds и _sampled_at
+        self._lock = threading.Lock()
+
+    def sample(self) -> None:
+        """Суммарные RSS и процессорное время дерева; загрузка CPU — между двумя замерами"""
+        with self._lock:
+            self._sample()
+
+    def _sample(self) -> None:
+        seen = set()
+        rss = 0
+        cpu_seconds = 0.0
+        for root in self.roots:
+            try:
+                tree = [root] + root.children(recursive=True)
+            except psutil.Error:
+                continue
+            for proc in tree:
+                if proc.pid in seen:
+                    continue
+                seen.add(proc.pid)
+                try:
+                    with proc.oneshot():
+                        rss += proc.memory_info().rss
+                        times = proc.cpu_times()
+                        cpu_seconds += times.user + times.system
+                except psutil.Error:
+                    continue
+
+        now = time.time()
+        if self._sampled_at is not None and now > self._sampled_at:
+            # Завершившиеся рендереры уносят своё время — не даём загрузке уйти в минус
+            self.cpu_percent = max(0.0, (cpu_seconds - self.cpu_seconds) / (now - self._sampled_at) * 100)
+        self._sampled_at = now
+        self.rss = rss
+        self.cpu_seconds = cpu_seconds
+        self.processes = len(seen)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return self._to_dict()
+
+    def _to_dict(self) -> Dict:
+        return {
+            "worker_id": self.worker_id,
+            "processes": self.processes,
+            "rss_mb": round(self.rss / 1024 / 1024, 1),
+            "cpu_seconds": round(self.cpu_seconds, 2),
+            "cpu_percent": round(self.cpu_percent, 1),
+            "uptime": round(time.time() - self.started, 1),
+        }
+
+
+class ProcessMonitor:
+    """
+    Учёт ресурсов деревьев процессов Chrome по воркерам для метрик и /health.
+    Воркеры с одинаковым worker_id из параллельных запросов суммируются в одной серии метрик.
+    """
+
+    def __init__(self):
+        self._trees: Dict[int, ProcessTree] = {}
+        self._handles = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return psutil is not None
+
+    def register(self, worker_id: int, pids: Iterable[int]) -> Optional[int]:
+        """Начинает учёт дерева процессов драйвера; возвращает handle или None без psutil"""
+        if psutil is None:
+            return None
+        try:
+            tree = ProcessTree(worker_id, pids)
+        except psutil.Error as e:
+            logger.debug(f"Worker {worker_id}: failed to attach to driver processes: {e}")
+            return None
+
+        with self._lock:
+            handle = next(self._handles)
+            self._trees[handle] = tree
+        self.sample(handle)
+        return handle
+
+    def unregister(self, handle: Optional[int]) -> None:
+        if handle is None:
+            return
+        with self._lock:
+            tree = self._trees.pop(handle, None)
+        if tree is not None:
+            self._export(tree.worker_id)
+
+    def sample(self, handle: Optional[int]) -> Optional[ProcessTree]:
+        """Обновляет замер дерева и метрики его воркера"""
+        if handle is None:
+            return None
+        with self._lock:
+            tree = self._trees.get(handle)
+        if tree is None:
+            return None
+        tree.sample()
+        self._export(tree.worker_id)
+        return tree
+
+    def _export(self, worker_id: int) -> None:
+        with self._lock:
+            trees = [tree for tree in self._trees.values() if tree.worker_id == worker_id]
+
+        label = str(worker_id)
+        if not trees:
+            for metric in (WORKER_RSS_BYTES, WORKER_CPU_PERCENT, WORKER_PROCESSES):
+                try:
+                    metric.remove(label)
+                except KeyError:
+                    pass
+            return
+
+        WORKER_RSS_BYTES.labels(label).set(sum(tree.rss for tree in trees))
+        WORKER_CPU_PERCENT.labels(label).set(sum(tree.cpu_percent for tree in trees))
+        WORKER_PROCESSES.labels(label).set(sum(tree.processes for tree in trees))
+
+    def snapshot(self) -> List[Dict]:
+        """Последние замеры всех драйверов (воркеры обновляют их после каждого артикула)"""
+        with self._lock:
+            trees = list(self._trees.values())
+        return sorted((tree.to_dict() for tree in trees), key=lambda item: item["worker_id"])
+
+
+process_monitor = ProcessMonitor()
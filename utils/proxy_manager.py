@@ -1,11 +1,21 @@
+import asyncio
+import hashlib
 import logging
 import random
-from dataclasses import dataclass
+import threading
+import time
+from dataclasses import dataclass, fields
+from datetime import date
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 
 from config.settings import settings
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,57 +25,486 @@ class ProxyInfo:
     port: str
     login: str
     password: str
+    rate_limit: Optional[float] = None  # запросов в минуту; None — PROXY_RATE_PER_MINUTE
+    daily_budget_mb: Optional[float] = None  # МБ трафика в сутки; None — PROXY_DAILY_BUDGET_MB
 
     @property
     def browser_proxy(self) -> str:
         # То, что можно безопасно передавать в --proxy-server
         return f"http://{self.host}:{self.port}"
 
+    @property
+    def key(self) -> str:
+        # У ротирующих провайдеров один host:port, а выходной IP задаётся логином
+        return f"{self.login}@{self.host}:{self.port}"
+
+
+def mask_proxy_key(key: str) -> str:
+    """Ключ прокси для ответов API: логин (выходной IP у ротирующих провайдеров) скрыт"""
+    login, at, address = key.rpartition("@")
+    if not at:
+        return key
+    return f"{login[:2]}***@{address}"
+
+
+def proxy_id(key: str) -> str:
+    """Стабильный идентификатор прокси для API: не раскрывает логин, не меняется между перезагрузками"""
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+
+@dataclass
+class ProxyHealth:
+    """Состояние прокси по фоновым проверкам и исходам запросов воркеров"""
+    latency: Optional[float] = None  # EWMA задержки проверки, сек
+    block_rate: float = 0.0  # EWMA доли блокировок (антибот, капча)
+    captcha_rate: float = 0.0  # EWMA доли капч
+    consecutive_failures: int = 0  # прокси не ответил (проверка или запрос воркера)
+    consecutive_blocks: int = 0  # Ozon заблокировал или показал капчу; сбрасывает только удачный запрос к Ozon
+    last_checked: Optional[float] = None
+    quarantined_at: Optional[float] = None  # последняя неудача в карантине; от неё отсчитывается cooldown
+
+    # Задержка, при которой вес прокси падает вдвое
+    LATENCY_REFERENCE = 1.0
+    # Минимальный вес живого прокси, чтобы он изредка получал трафик и обновлял статистику
+    MIN_SCORE = 0.02
+
+    @property
+    def strikes(self) -> int:
+        """Неудачи подряд для карантина: обрывы соединения или блокировки Ozon"""
+        return max(self.consecutive_failures, self.consecutive_blocks)
+
+    @property
+    def quarantined(self) -> bool:
+        # После cooldown прокси снова выбирается (с малым весом), даже если фоновые проверки выключены
+        if self.strikes < settings.PROXY_MAX_CONSECUTIVE_FAILURES:
+            return False
+        return self.quarantined_at is None or time.time() - self.quarantined_at < settings.PROXY_QUARANTINE_COOLDOWN
+
+    @property
+    def score(self) -> float:
+        if self.quarantined:
+            return 0.0
+
+        score = 1.0
+        if self.latency is not None:
+            score /= 1.0 + self.latency / self.LATENCY_REFERENCE
+        score *= 1.0 - self.block_rate
+        score *= 1.0 - 0.5 * self.captcha_rate
+        score *= 0.5 ** self.strikes
+        return max(score, self.MIN_SCORE)
+
+
+def parse_proxy_line(raw: str) -> Optional[ProxyInfo]:
+    """
+    Разбирает строку host:port:login:password[:запросов_в_минуту[:МБ_в_сутки]];
+    пустое поле — значение из настроек. None — строка некорректна.
+    """
+    parts = raw.strip().split(":")
+    if len(parts) not in (4, 5, 6) or not all(parts[:4]):
+        logger.warning("Invalid proxy format, expected host:port:login:password[:rate[:budget_mb]] -> %s", raw)
+        return None
+
+    host, port, login, password = parts[:4]
+    proxy_info = ProxyInfo(host=host, port=port, login=login, password=password)
+    if len(parts) >= 5 and parts[4]:
+        try:
+            proxy_info.rate_limit = float(parts[4])
+        except ValueError:
+            logger.warning("Invalid proxy rate limit %r for %s", parts[4], proxy_info.key)
+    if len(parts) == 6 and parts[5]:
+        try:
+            proxy_info.daily_budget_mb = float(parts[5])
+        except ValueError:
+            logger.warning("Invalid proxy daily budget %r for %s", parts[5], proxy_info.key)
+    return proxy_info
 
 
 class ProxyManager:
+    # Вес нового наблюдения в EWMA
+    EWMA_ALPHA = 0.2
+    # Множитель веса прокси с исчерпанным дневным бюджетом: выбирается, только если других почти нет
+    EXHAUSTED_BUDGET_WEIGHT = 0.05
+
     def __init__(self, proxy_file: str, enabled: bool = True):
         self.proxy_file = Path(proxy_file)
         self.enabled = enabled
         self._proxies: List[ProxyInfo] = []
+        self._health: Dict[str, ProxyHealth] = {}
+        # Ключи прокси из файла (остальные добавлены через API и при перечитывании файла не удаляются)
+        self._file_keys: Set[str] = set()
+        # Не выдаются новым драйверам, текущие дорабатывают
+        self._draining: Set[str] = set()
+        # Удалены: драйверы на них завершают текущий артикул и уходят
+        self._removed: Set[str] = set()
+        # Байты за текущие сутки по прокси (и по удалённым — до конца суток)
+        self._usage: Dict[str, int] = {}
+        self._usage_day = date.today()
+        self._file_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self._prober_thread: Optional[threading.Thread] = None
+        self._prober_stop = threading.Event()
+        self._watcher_thread: Optional[threading.Thread] = None
+        self._watcher_stop = threading.Event()
         self._load_proxies()
 
-    def _load_proxies(self) -> None:
-        if not self.enabled:
-            logger.info("Proxy usage is disabled via settings")
-            return
-
+    def _read_proxy_file(self) -> Optional[List[ProxyInfo]]:
         if not self.proxy_file.exists():
             logger.warning("Proxy file not found: %s", self.proxy_file)
-            return
+            return None
 
         try:
+            self._file_mtime = self.proxy_file.stat().st_mtime
+            proxies = []
             with self.proxy_file.open("r", encoding="utf-8") as file:
                 for line in file:
                     raw = line.strip()
                     if not raw or raw.startswith("#"):
                         continue
 
-                    parts = raw.split(":")
-                    if len(parts) != 4:
-                        logger.warning("Invalid proxy format, expected host:port:login:password -> %s", raw)
-                        continue
-
-                    host, port, login, password = parts
-                    proxy_info = ProxyInfo(host=host, port=port, login=login, password=password)
-                    self._proxies.append(proxy_info)
-
-            logger.info("Loaded %d proxies from %s", len(self._proxies), self.proxy_file)
+                    proxy_info = parse_proxy_line(raw)
+                    if proxy_info:
+                        proxies.append(proxy_info)
+            return proxies
         except Exception as exc:
             logger.error("Failed to load proxies: %s", exc)
+            return None
+
+    def _load_proxies(self) -> None:
+        if not self.enabled:
+            logger.info("Proxy usage is disabled via settings")
+            return
+
+        proxies = self._read_proxy_file()
+        if proxies is None:
+            return
+
+        for proxy_info in proxies:
+            self._add(proxy_info)
+            self._file_keys.add(proxy_info.key)
+
+        logger.info("Loaded %d proxies from %s", len(self._proxies), self.proxy_file)
+
+    def _add(self, proxy: ProxyInfo) -> bool:
+        """Добавляет или обновляет прокси. Вызывать под self._lock (или до запуска потоков)"""
+        self._removed.discard(proxy.key)
+        for existing in self._proxies:
+            if existing.key == proxy.key:
+                # На месте: драйверы держат этот же объект и сразу получают новые лимит и бюджет
+                for item in fields(ProxyInfo):
+                    setattr(existing, item.name, getattr(proxy, item.name))
+                return False
+
+        self._proxies.append(proxy)
+        self._health.setdefault(proxy.key, ProxyHealth())
+        return True
+
+    def _remove(self, key: str) -> bool:
+        """Убирает прокси из ротации. Вызывать под self._lock"""
+        proxies = [proxy for proxy in self._proxies if proxy.key != key]
+        if len(proxies) == len(self._proxies):
+            return False
+
+        self._proxies = proxies
+        self._health.pop(key, None)
+        self._draining.discard(key)
+        self._file_keys.discard(key)
+        self._removed.add(key)
+        return True
+
+    def reload(self) -> Dict[str, int]:
+        """
+        Перечитывает файл прокси: новые добавляются, пропавшие из файла удаляются,
+        у остальных обновляются параметры. Прокси, добавленные через API, не трогаются.
+        """
+        proxies = self._read_proxy_file()
+        if proxies is None:
+            return {"added": 0, "removed": 0}
+
+        file_keys = {proxy.key for proxy in proxies}
+        with self._lock:
+            added = sum(self._add(proxy) for proxy in proxies)
+            removed = sum(self._remove(key) for key in self._file_keys - file_keys)
+            self._file_keys = file_keys
+
+        logger.info("Proxy list reloaded from %s: %d added, %d removed, %d total",
+                    self.proxy_file, added, removed, len(self._proxies))
+        return {"added": added, "removed": removed}
+
+    def add_proxy(self, proxy: ProxyInfo) -> bool:
+        """Добавляет прокси в ротацию (или возвращает в неё прокси, который был на дренаже)"""
+        with self._lock:
+            added = self._add(proxy)
+            self._draining.discard(proxy.key)
+        logger.info("Proxy %s %s", proxy.key, "added" if added else "updated")
+        return added
+
+    def find_keys(self, ref: str) -> List[str]:
+        """Ключи прокси в ротации по ключу, id из GET /proxies или маскированному ключу"""
+        with self._lock:
+            keys = [proxy.key for proxy in self._proxies]
+        for match in (lambda key: key == ref, lambda key: proxy_id(key) == ref):
+            found = [key for key in keys if match(key)]
+            if found:
+                return found
+        # Маскированный ключ может совпасть у нескольких логинов — решает вызывающий
+        return [key for key in keys if mask_proxy_key(key) == ref]
+
+    def drain_proxy(self, key: str) -> bool:
+        """Перестаёт выдавать прокси новым драйверам, работающие драйверы не трогает"""
+        with self._lock:
+            if not any(proxy.key == key for proxy in self._proxies):
+                return False
+            self._draining.add(key)
+        logger.info("Proxy %s is draining", key)
+        return True
+
+    def remove_proxy(self, key: str) -> bool:
+        with self._lock:
+            removed = self._remove(key)
+        if removed:
+            logger.info("Proxy %s removed, its drivers retire after the current article", key)
+        return removed
+
+    def is_removed(self, proxy: Optional[ProxyInfo]) -> bool:
+        return proxy is not None and proxy.key in self._removed
 
     def has_proxies(self) -> bool:
         return bool(self._proxies)
 
-    def get_random_proxy(self) -> Optional[ProxyInfo]:
-        if not self._proxies:
+    def get_proxies(self) -> List[ProxyInfo]:
+        """Прокси, которые могут получить новые драйверы (без дренажа)"""
+        with self._lock:
+            return [proxy for proxy in self._proxies if proxy.key not in self._draining]
+
+    def proxy_states(self) -> Dict[str, str]:
+        with self._lock:
+            states = {proxy.key: "draining" if proxy.key in self._draining else "active"
+                      for proxy in self._proxies}
+            states.update({key: "removed" for key in self._removed})
+            return states
+
+    def get_random_proxy(self, exclude: Optional[ProxyInfo] = None) -> Optional[ProxyInfo]:
+        """
+        Выбирает прокси с вероятностью, пропорциональной его оценке здоровья.
+        Прокси в карантине (подряд PROXY_MAX_CONSECUTIVE_FAILURES неудач) не выбираются;
+        если в карантине все — берётся прокси с наименьшим числом неудач, но не прямое подключение.
+        None — только когда выдавать нечего (прокси нет или все на дренаже).
+        """
+        proxies = self.get_proxies()
+        if not proxies:
+            return None
+
+        candidates = [proxy for proxy in proxies if proxy != exclude] or proxies
+        with self._lock:
+            weights = [self._health[proxy.key].score if proxy.key in self._health else 0.0
+                       for proxy in candidates]
+            # Прокси с исчерпанным бюджетом уступают трафик остальным
+            weights = [weight * self.EXHAUSTED_BUDGET_WEIGHT if (self._budget_used(proxy) or 0.0) >= 1.0
+                       else weight for proxy, weight in zip(candidates, weights)]
+
+            if not any(weights):
+                least_bad = min(candidates, key=lambda proxy: self._health[proxy.key].strikes
+                                if proxy.key in self._health else 0)
+                logger.warning("All %d candidate proxies are quarantined, using least failing %s",
+                               len(candidates), least_bad.key)
+                return least_bad
+
+        return random.choices(candidates, weights=weights)[0]
+
+    def _update(self, proxy: Optional[ProxyInfo], success: bool, latency: Optional[float] = None,
+                blocked: bool = False, captcha: bool = False, probe: bool = False) -> None:
+        if proxy is None:
+            return
+
+        alpha = self.EWMA_ALPHA
+        with self._lock:
+            health = self._health.get(proxy.key)
+            if health is None:
+                # Прокси удалён, пока шёл запрос
+                return
+            was_quarantined = health.quarantined
+
+            if latency is not None:
+                health.latency = latency if health.latency is None else \
+                    health.latency + alpha * (latency - health.latency)
+            if (success and not probe) or blocked:
+                # Исход запроса к Ozon: прокси отвечает, но могла быть блокировка
+                health.block_rate += alpha * (float(blocked) - health.block_rate)
+                health.captcha_rate += alpha * (float(captcha) - health.captcha_rate)
+            if blocked:
+                # Прокси отвечает, но Ozon его блокирует: блокировки подряд тоже ведут в карантин
+                health.consecutive_blocks += 1
+            elif success:
+                health.consecutive_failures = 0
+                if not probe:
+                    # Живость по фоновой проверке не значит, что Ozon перестал блокировать
+                    health.consecutive_blocks = 0
+            else:
+                health.consecutive_failures += 1
+
+            if health.strikes >= settings.PROXY_MAX_CONSECUTIVE_FAILURES:
+                if not success:
+                    health.quarantined_at = time.time()
+            else:
+                health.quarantined_at = None
+
+            quarantined = health.quarantined
+
+        if quarantined and not was_quarantined:
+            logger.warning("Proxy %s quarantined after %d consecutive failures (%d blocks)",
+                           proxy.key, health.strikes, health.consecutive_blocks)
+        elif was_quarantined and not quarantined:
+            logger.info("Proxy %s is back in rotation", proxy.key)
+
+    def report_success(self, proxy: Optional[ProxyInfo], latency: Optional[float] = None,
+                       probe: bool = False) -> None:
+        """probe — удачная фоновая проверка живости, а не ответ Ozon: блокировки она не сбрасывает"""
+        self._update(proxy, success=True, latency=latency, probe=probe)
+
+    def report_block(self, proxy: Optional[ProxyInfo], captcha: bool = False) -> None:
+        self._update(proxy, success=False, blocked=True, captcha=captcha)
+
+    def report_failure(self, proxy: Optional[ProxyInfo]) -> None:
+        """Прокси не отвечает: ошибка соединения или таймаут"""
+        self._update(proxy, success=False)
+
+    def _roll_usage_day(self) -> None:
+        # Вызывается под self._lock: в новые сутки бюджеты начинаются заново
+        today = date.today()
+        if today != self._usage_day:
+            self._usage.clear()
+            self._usage_day = today
+
+    def _budget_used(self, proxy: ProxyInfo) -> Optional[float]:
+        # Вызывается под self._lock
+        budget_mb = proxy.daily_budget_mb if proxy.daily_budget_mb is not None else settings.PROXY_DAILY_BUDGET_MB
+        if not budget_mb:
             return None
-        return random.choice(self._proxies)
+        self._roll_usage_day()
+        return self._usage.get(proxy.key, 0) / (budget_mb * 1024 * 1024)
+
+    def report_bytes(self, proxy: Optional[ProxyInfo], received: int) -> None:
+        """Трафик браузера через прокси (по сетевым событиям CDP)"""
+        if proxy is None or received <= 0:
+            return
+        with self._lock:
+            self._roll_usage_day()
+            self._usage[proxy.key] = self._usage.get(proxy.key, 0) + received
+
+    def budget_used(self, proxy: Optional[ProxyInfo]) -> Optional[float]:
+        """Доля дневного бюджета трафика прокси; None — прямое подключение или бюджет не задан"""
+        if proxy is None:
+            return None
+        with self._lock:
+            return self._budget_used(proxy)
+
+    def bandwidth_snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            self._roll_usage_day()
+            snapshot = {}
+            for proxy in self._proxies:
+                used = self._budget_used(proxy)
+                snapshot[proxy.key] = {
+                    "today_mb": round(self._usage.get(proxy.key, 0) / 1024 / 1024, 2),
+                    "budget_used": round(used, 3) if used is not None else None,
+                }
+            return snapshot
+
+    def health_snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                key: {
+                    "score": round(health.score, 3),
+                    "latency": round(health.latency, 3) if health.latency is not None else None,
+                    "block_rate": round(health.block_rate, 3),
+                    "captcha_rate": round(health.captcha_rate, 3),
+                    "consecutive_failures": health.consecutive_failures,
+                    "consecutive_blocks": health.consecutive_blocks,
+                    "quarantined": health.quarantined,
+                    "last_checked": health.last_checked,
+                }
+                for key, health in self._health.items()
+            }
+
+    async def _probe(self, session, proxy: ProxyInfo) -> None:
+        start_time = time.perf_counter()
+        try:
+            async with session.get(settings.PROXY_CHECK_URL,
+                                   proxy=proxy.browser_proxy,
+                                   proxy_auth=aiohttp.BasicAuth(proxy.login, proxy.password),
+                                   allow_redirects=False) as response:
+                await response.read()
+            self.report_success(proxy, latency=time.perf_counter() - start_time, probe=True)
+        except Exception as exc:
+            logger.debug("Proxy %s health check failed: %s", proxy.key, exc)
+            self.report_failure(proxy)
+        finally:
+            with self._lock:
+                if proxy.key in self._health:
+                    self._health[proxy.key].last_checked = time.time()
+
+    async def probe_all(self) -> None:
+        """Параллельно проверяет все прокси и обновляет их оценки"""
+        timeout = aiohttp.ClientTimeout(total=settings.PROXY_CHECK_TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            with self._lock:
+                proxies = list(self._proxies)
+            await asyncio.gather(*(self._probe(session, proxy) for proxy in proxies))
+
+    def _run_prober(self) -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            while not self._prober_stop.is_set():
+                try:
+                    loop.run_until_complete(self.probe_all())
+                    logger.debug("Proxy health: %s", self.health_snapshot())
+                except Exception as exc:
+                    logger.warning("Proxy health check round failed: %s", exc)
+                self._prober_stop.wait(settings.PROXY_CHECK_INTERVAL)
+        finally:
+            loop.close()
+
+    def start_health_checks(self) -> None:
+        """Фоновая проверка прокси в отдельном потоке со своим event loop"""
+        if not self.enabled or settings.PROXY_CHECK_INTERVAL <= 0:
+            return
+        if aiohttp is None:
+            logger.warning("aiohttp is not installed, proxy health checks are disabled")
+            return
+        if self._prober_thread and self._prober_thread.is_alive():
+            return
+
+        self._prober_stop.clear()
+        self._prober_thread = threading.Thread(target=self._run_prober, name="proxy-prober", daemon=True)
+        self._prober_thread.start()
+        logger.info("Proxy health checks started (every %ds)", settings.PROXY_CHECK_INTERVAL)
+
+    def stop_health_checks(self) -> None:
+        self._prober_stop.set()
+
+    def _run_watcher(self) -> None:
+        while not self._watcher_stop.wait(settings.PROXY_RELOAD_INTERVAL):
+            try:
+                mtime = self.proxy_file.stat().st_mtime if self.proxy_file.exists() else None
+                if mtime is not None and mtime != self._file_mtime:
+                    self.reload()
+            except Exception as exc:
+                logger.warning("Failed to reload proxy file: %s", exc)
+
+    def start_watching(self) -> None:
+        """Следит за изменением файла прокси и перечитывает его без перезапуска API"""
+        if not self.enabled or settings.PROXY_RELOAD_INTERVAL <= 0:
+            return
+        if self._watcher_thread and self._watcher_thread.is_alive():
+            return
+
+        self._watcher_stop.clear()
+        self._watcher_thread = threading.Thread(target=self._run_watcher, name="proxy-watcher", daemon=True)
+        self._watcher_thread.start()
+        logger.info("Watching %s for changes (every %ds)", self.proxy_file, settings.PROXY_RELOAD_INTERVAL)
+
+    def stop_watching(self) -> None:
+        self._watcher_stop.set()
 
 
 proxy_manager = ProxyManager(settings.PROXY_LIST_PATH, enabled=settings.ENABLE_PROXY)
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from config.settings import settings
+from utils.proxy_manager import ProxyInfo
+
+logger = logging.getLogger(__name__)
+
+# Бакет для прямого подключения без прокси — это тоже один IP
+DIRECT_KEY = "direct"
+
+
+class TokenBucket:
+    """
+    Token bucket: rate_per_minute запросов в минуту, всплеск до capacity подряд.
+    Токен резервируется под блокировкой, ожидание — вне её, поэтому потоки
+    обслуживаются по очереди и не будят друг друга впустую.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int):
+        self.rate_per_minute = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def set_rate(self, rate_per_minute: float) -> None:
+        """Новый лимит (перечитан файл прокси): накопленные по старому лимиту токены сохраняются"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.rate_per_minute = rate_per_minute
+            self.rate = rate_per_minute / 60.0
+
+    def acquire(self) -> float:
+        """Забирает токен, при необходимости ждёт. Возвращает время ожидания, сек"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+            self.acquired += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.last_wait = wait
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "rate_per_minute": round(self.rate * 60, 2),
+                "capacity": self.capacity,
+                "acquired": self.acquired,
+                "total_wait": round(self.total_wait, 3),
+                "avg_wait": round(self.total_wait / self.acquired, 3) if self.acquired else 0.0,
+                "max_wait": round(self.max_wait, 3),
+                "last_wait": round(self.last_wait, 3),
+            }
+
+
+class ProxyRateLimiter:
+    """
+    Общий для всех воркеров и бэкендов (Selenium, Playwright) лимит запросов к Ozon на каждый прокси.
+    Лимит берётся из файла прокси (пятое поле, запросов в минуту) или из PROXY_RATE_PER_MINUTE.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, proxy: Optional[ProxyInfo]) -> Optional[TokenBucket]:
+        rate = proxy.rate_limit if proxy and proxy.rate_limit is not None else self.rate_per_minute
+        if rate <= 0:
+            return None
+
+        key = proxy.key if proxy else DIRECT_KEY
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, self.burst)
+            elif bucket.rate_per_minute != rate:
+                logger.info("Rate limit for %s changed to %.1f/min", key, rate)
+                bucket.set_rate(rate)
+            return bucket
+
+    def acquire(self, proxy: Optional[ProxyInfo]) -> float:
+        """Вызывать перед каждой навигацией/запросом к Ozon через этот прокси"""
+        bucket = self._bucket(proxy)
+        if bucket is None:
+            return 0.0
+
+        wait = bucket.acquire()
+        if wait >= 1.0:
+            logger.info("Rate limit: waited %.1fs for %s", wait, proxy.key if proxy else DIRECT_KEY)
+        return wait
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {key: bucket.snapshot() for key, bucket in buckets.items()}
+
+
+rate_limiter = ProxyRateLimiter(settings.PROXY_RATE_PER_MINUTE, settings.PROXY_BURST)
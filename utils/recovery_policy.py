@@ -0,0 +1,100 @@
+import logging
+import random
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SOLVE = "solve"
+REFRESH = "refresh"
+ROTATE_PROXY = "rotate_proxy"
+NEW_DRIVER = "new_driver"
+
+STRATEGIES = (SOLVE, REFRESH, ROTATE_PROXY, NEW_DRIVER)
+
+
+@dataclass
+class StrategyStats:
+    """Живая статистика стратегии: EWMA длительности и сглаженная доля успехов"""
+    duration: float
+    successes: float
+    attempts: float
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.attempts
+
+    @property
+    def expected_recovery_time(self) -> float:
+        # Повторяем стратегию до успеха: в среднем 1 / p попыток по duration секунд
+        return self.duration / max(self.success_rate, 0.01)
+
+
+class RecoveryPolicy:
+    """
+    Выбор способа выхода из капчи/блокировки по ожидаемому времени восстановления.
+
+    Стратегии: решить капчу, обновить страницу, сменить прокси, пересоздать драйвер.
+    Априорные оценки заменяются живой статистикой: длительность — EWMA,
+    успехи и попытки затухают, чтобы оценки следовали за текущим поведением Ozon.
+    """
+
+    # (секунд на попытку, вероятность успеха) до появления статистики
+    PRIORS = {
+        SOLVE: (90.0, 0.5),
+        REFRESH: (10.0, 0.2),
+        ROTATE_PROXY: (25.0, 0.7),
+        NEW_DRIVER: (25.0, 0.5),
+    }
+    # Вес априорной оценки в попытках
+    PRIOR_WEIGHT = 2.0
+    DURATION_ALPHA = 0.2
+    DECAY = 0.95
+
+    def __init__(self, exploration: float = 0.0):
+        self.exploration = exploration
+        self._lock = threading.Lock()
+        self._stats: Dict[str, StrategyStats] = {
+            strategy: StrategyStats(duration=duration,
+                                    successes=probability * self.PRIOR_WEIGHT,
+                                    attempts=self.PRIOR_WEIGHT)
+            for strategy, (duration, probability) in self.PRIORS.items()
+        }
+
+    def choose(self, available: Optional[Iterable[str]] = None) -> str:
+        """Стратегия с минимальным ожидаемым временем восстановления (с редкой разведкой)"""
+        candidates = list(available) if available is not None else list(STRATEGIES)
+
+        if len(candidates) > 1 and random.random() < self.exploration:
+            return random.choice(candidates)
+
+        with self._lock:
+            return min(candidates, key=lambda strategy: self._stats[strategy].expected_recovery_time)
+
+    def record(self, strategy: str, duration: float, success: bool) -> None:
+        with self._lock:
+            stats = self._stats[strategy]
+            stats.duration += self.DURATION_ALPHA * (duration - stats.duration)
+            stats.successes = stats.successes * self.DECAY + (1.0 if success else 0.0)
+            stats.attempts = stats.attempts * self.DECAY + 1.0
+
+        logger.info("Recovery strategy %s %s in %.1fs (expected time to recovery now %.1fs)",
+                    strategy, "succeeded" if success else "failed", duration,
+                    stats.expected_recovery_time)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                strategy: {
+                    "duration": round(stats.duration, 2),
+                    "success_rate": round(stats.success_rate, 3),
+                    "expected_recovery_time": round(stats.expected_recovery_time, 2),
+                }
+                for strategy, stats in self._stats.items()
+            }
+
+
+recovery_policy = RecoveryPolicy(exploration=settings.RECOVERY_EXPLORATION)
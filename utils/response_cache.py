@@ -0,0 +1,49 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Set, Tuple
+
+from config.settings import settings
+from models.schemas import ArticleResult, PROJECTABLE_FIELDS
+
+
+class ResponseCache:
+    """LRU-кэш успешных результатов разбора composer-api (все поля) по артикулу с временем жизни"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[float, ArticleResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, article: int, fields: Optional[Set[str]] = None) -> Optional[ArticleResult]:
+        """Копия результата, урезанная до fields и помеченная cached/cache_age; None — нет или устарел"""
+        with self._lock:
+            entry = self._entries.get(article)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[article]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(article)
+            self.hits += 1
+            stored_at, result = entry
+
+        update = {name: None for name in PROJECTABLE_FIELDS if fields is not None and name not in fields}
+        update.update(cached=True, cache_age=round(time.time() - stored_at, 1))
+        return result.model_copy(update=update)
+
+    def put(self, result: ArticleResult) -> None:
+        """Кэшируются только успешные результаты со всеми полями"""
+        if self.max_entries <= 0 or not result.success:
+            return
+        with self._lock:
+            self._entries[result.article] = (time.time(), result.model_copy(update={"timings": None}))
+            self._entries.move_to_end(result.article)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+composer_cache = ResponseCache(settings.COMPOSER_CACHE_SIZE, settings.COMPOSER_CACHE_TTL)
@@ -0,0 +1,68 @@
+import logging
+from typing import Any, Dict
+
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+
+try:
+    import msgpack
+except ImportError:  # msgpack необязателен — без него всегда отдаём JSON
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+class MsgPackResponse(Response):
+    """Бинарный ответ MessagePack с той же схемой, что и JSON"""
+
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        assert msgpack is not None, "msgpack must be installed to use MsgPackResponse"
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def parse_accept(accept: str) -> Dict[str, float]:
+    """Диапазоны типов из заголовка Accept с их q (без q — 1.0)"""
+    accepted = {}
+    for part in accept.lower().split(","):
+        media_range, *params = [item.strip() for item in part.split(";")]
+        if not media_range:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[media_range] = max(quality, accepted.get(media_range, 0.0))
+    return accepted
+
+
+def wants_msgpack(request: Request) -> bool:
+    """
+    MessagePack, только если клиент явно назвал его тип с q > 0 и не меньшим, чем у JSON
+    (application/json, application/* или */*); при равенстве — MessagePack
+    """
+    accepted = parse_accept(request.headers.get("accept", ""))
+    msgpack_quality = max(accepted.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    if msgpack_quality <= 0:
+        return False
+    json_quality = next((accepted[media_range] for media_range in ("application/json", "application/*", "*/*")
+                         if media_range in accepted), 0.0)
+    return msgpack_quality >= json_quality
+
+
+def negotiated_response(request: Request, content: Any) -> Response:
+    """
+    Выбирает формат ответа по заголовку Accept:
+    MessagePack для сервисных клиентов, иначе orjson.
+    """
+    if wants_msgpack(request):
+        if msgpack is not None:
+            return MsgPackResponse(content=content)
+        logger.warning("Client requested MessagePack, but msgpack is not installed; falling back to JSON")
+    return ORJSONResponse(content=content)
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from utils.proxy_manager import ProxyInfo
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    Куки и localStorage браузера, привязанные к прокси.
+    Ozon связывает антибот-куки с IP, поэтому сессия восстанавливается
+    только на том же прокси, с которого была сохранена.
+    """
+
+    def __init__(self, directory: str, max_age: int):
+        self.directory = Path(directory)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _path(self, proxy: Optional[ProxyInfo]) -> Path:
+        key = proxy.key if proxy else "direct"
+        # Ключ содержит логин прокси — в имени файла только хэш
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return self.directory / f"{digest}.json"
+
+    def save(self, proxy: Optional[ProxyInfo], cookies: List[Dict[str, Any]],
+             local_storage: Dict[str, Dict[str, str]]) -> None:
+        if not cookies:
+            return
+
+        path = self._path(proxy)
+        data = {
+            "proxy": proxy.browser_proxy if proxy else None,
+            "saved_at": time.time(),
+            "cookies": cookies,
+            "local_storage": local_storage,
+        }
+        try:
+            with self._lock:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix(".tmp")
+                with tmp_path.open("w", encoding="utf-8") as file:
+                    json.dump(data, file, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            logger.info("Session saved for %s: %d cookies", data["proxy"] or "direct", len(cookies))
+        except Exception as exc:
+            logger.warning("Failed to save session: %s", exc)
+
+    def load(self, proxy: Optional[ProxyInfo]) -> Optional[Dict[str, Any]]:
+        """Сохранённая сессия прокси или None, если её нет или она старше max_age"""
+        path = self._path(proxy)
+        if not path.exists():
+            return None
+
+        try:
+            with self._lock, path.open("r", encoding="utf-8") as file:
+                data = json.load(file)
+        except Exception as exc:
+            logger.warning("Failed to load session %s: %s", path, exc)
+            return None
+
+        if time.time() - data.get("saved_at", 0) > self.max_age:
+            logger.info("Session for %s is expired", data.get("proxy") or "direct")
+            return None
+        return data
+
+    def discard(self, proxy: Optional[ProxyInfo]) -> None:
+        """Удаляет сессию, которая привела к блокировке"""
+        try:
+            self._path(proxy).unlink(missing_ok=True)
+        except Exception as exc:
+            logger.debug("Failed to discard session: %s", exc)
+
+
+session_store = SessionStore(settings.SESSION_STORE_DIR, settings.SESSION_MAX_AGE)